@@ -0,0 +1,273 @@
+"""
+Vectorized analysis of many Minesweeper boards at once using numpy arrays.
+Boards are stacked into arrays of shape (number of boards, rows, cols) with the same values as mine() i.e.
+9 for a mine and the number of surrounding mines otherwise.
+Positions of games in progress are stacked the same way into arrays of shape
+(number of positions, len(POSITION_PLANES), rows, cols) holding the planes named in POSITION_PLANES,
+see squaresToPlanes().
+Can be used from Python or from the command line over a board corpus stored as a .npy file:
+    python BatchAnalysis.py generate corpus.npy --count 1000000 --difficulty hard --seed 1
+    python BatchAnalysis.py stats corpus.npy --out stats.csv
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy import ndimage
+
+from Minesweeper import DIFFICULTIES
+
+# Boards analyzed at once when going through a corpus, bounds the memory used
+CHUNK_SIZE = 20000
+
+# Names of the statistics computed by boardStatistics(), in the column order of the CSV output
+STATISTICS = ('threeBV', 'openings', 'largestOpening', 'openingTiles', 'isolatedNumbers', 'frontierDensity')
+
+# Positions worked on at once by trivialDeductions(), small enough for the working arrays to stay in the CPU cache
+DEDUCTION_CHUNK_SIZE = 256
+
+# Planes of a stacked position: hint of visible tiles (0 for hidden ones), visible tiles, tiles known to be mines
+# and tiles known to be safe
+POSITION_PLANES = ('value', 'visible', 'flag', 'safe')
+
+# Connects tiles to their 8 surrounding tiles within the same board only, never across stacked boards
+BOARD_CONNECTIVITY = np.zeros((3, 3, 3), dtype=bool)
+BOARD_CONNECTIVITY[1] = True
+
+
+def countNeighbours(planes):
+    """
+    Counts for every tile how many of its 8 surrounding tiles are set
+    :param planes: Boolean array of shape (..., rows, cols), or uint8 array to sum the surrounding values
+        as long as the sums fit in a uint8
+    :return: uint8 array of the same shape with the count of set surrounding tiles
+    """
+    planes = planes.astype(np.uint8, copy=False)
+    padded = np.zeros(planes.shape[:-2] + (planes.shape[-2] + 2, planes.shape[-1] + 2), dtype=np.uint8)
+    padded[..., 1:-1, 1:-1] = planes
+    # The 3x3 sum is separable into a sum over 3 columns followed by a sum over 3 rows
+    columnSums = padded[..., :, :-2] + padded[..., :, 1:-1]
+    columnSums += padded[..., :, 2:]
+    counts = columnSums[..., :-2, :] + columnSums[..., 1:-1, :]
+    counts += columnSums[..., 2:, :]
+    counts -= planes
+    return counts
+
+
+def generateBoards(count, rows, cols, bombs, seed=None):
+    """
+    Creates many mine fields at once like calling mine() count times
+    :param count: Number of boards
+    :param rows: Rows of every board
+    :param cols: Columns of every board
+    :param bombs: Number of bombs/mines on every board
+    :param seed: Seed of the numpy random generator (default: None)
+    :return: uint8 array of shape (count, rows, cols) with 9 for mines and hint numbers elsewhere
+    """
+    rng = np.random.default_rng(seed)
+    # The 'bombs' smallest of a row of random keys are uniformly random distinct tiles
+    mineTiles = np.argpartition(rng.random((count, rows * cols)), bombs - 1, axis=1)[:, :bombs]
+    mines = np.zeros((count, rows * cols), dtype=bool)
+    np.put_along_axis(mines, mineTiles, True, axis=1)
+    mines = mines.reshape(count, rows, cols)
+    return np.where(mines, np.uint8(9), countNeighbours(mines))
+
+
+def boardsToArray(boards):
+    """
+    Helper function to stack boards made by mine() into an array
+    :param boards: List of 2D arrays representing Minefields of the same size
+    :return: uint8 array of shape (number of boards, rows, cols)
+    """
+    return np.asarray(boards, dtype=np.uint8)
+
+
+def boardStatistics(boards):
+    """
+    Computes difficulty statistics for every board
+        threeBV: Minimum number of clicks to clear the board (3BV), i.e. one per opening plus one per isolated number
+        openings: Number of openings i.e. connected regions of 0 tiles that are cleared by a single click
+        largestOpening: Number of 0 tiles in the largest opening
+        openingTiles: Number of 0 tiles in all openings
+        isolatedNumbers: Number tiles that are not next to an opening and must each be clicked
+        frontierDensity: Fraction of the safe tiles that show a number
+    :param boards: uint8 array of shape (number of boards, rows, cols) as made by generateBoards()
+    :return: Dictionary of statistic name to array with one value per board
+    """
+    boards = np.asarray(boards)
+    count = boards.shape[0]
+    zeros = boards == 0
+    numbers = (boards != 0) & (boards != 9)
+
+    labels, noOfLabels = ndimage.label(zeros, structure=BOARD_CONNECTIVITY)
+    labelledTiles = labels.ravel()
+    isLabelled = labelledTiles > 0
+    openingSizes = np.bincount(labelledTiles, minlength=noOfLabels + 1)[1:]
+    # Labels are unique over the whole stack, so every label is assigned the board it is on
+    boardOfLabel = np.zeros(noOfLabels + 1, dtype=np.int64)
+    boardOfLabel[labelledTiles[isLabelled]] = np.flatnonzero(isLabelled) // boards[0].size
+    boardOfLabel = boardOfLabel[1:]
+
+    openings = np.bincount(boardOfLabel, minlength=count)
+    largestOpening = np.zeros(count, dtype=np.int64)
+    np.maximum.at(largestOpening, boardOfLabel, openingSizes)
+    isolatedNumbers = (numbers & (countNeighbours(zeros) == 0)).sum(axis=(1, 2))
+    safeTiles = (boards != 9).sum(axis=(1, 2))
+
+    return {'threeBV': openings + isolatedNumbers,
+            'openings': openings,
+            'largestOpening': largestOpening,
+            'openingTiles': zeros.sum(axis=(1, 2)),
+            'isolatedNumbers': isolatedNumbers,
+            'frontierDensity': numbers.sum(axis=(1, 2)) / np.maximum(safeTiles, 1)}
+
+
+def squaresToPlanes(listOfSquares):
+    """
+    Helper function to turn the position of a game into planes that can be stacked for trivialDeductions().
+    The value of hidden tiles is left out so the planes hold only what the player knows, and the flag and safe
+    planes hold the mines (flagAI) and safe tiles found by the helper AI since those are the ones its rules count on.
+    :param listOfSquares: List of all Square Objects in the game
+    :return: uint8 array of shape (len(POSITION_PLANES), rows, cols) with the planes in the order of POSITION_PLANES
+    """
+    planes = np.zeros((len(POSITION_PLANES), len(listOfSquares), len(listOfSquares[0])), dtype=np.uint8)
+    for row in listOfSquares:
+        for square in row:
+            if square.visible:
+                planes[0, square.i, square.j] = square.val
+                planes[1, square.i, square.j] = 1
+            planes[2, square.i, square.j] = square.flagAI
+            planes[3, square.i, square.j] = square.safe
+    return planes
+
+
+def trivialDeductions(planes, findSafe=True, iterations=None, chunkSize=DEDUCTION_CHUNK_SIZE):
+    """
+    Applies the Straight-forward Logic of getAllMineNeighbours() and getAllFreeNeighbours() to many positions at once.
+    A visible number 'n' with 'm' flagged and 'u' unknown tiles (neither flagged nor marked safe) around it
+        has only mines around it if n == m + u and only safe tiles around it if n == m,
+        the counts for all tiles come from countNeighbours().
+    Every round applies both rules to all tiles at once, and rounds are repeated on the positions that changed
+    until no more tiles are found, giving the same tiles as the per-board functions.
+    :param planes: Array of shape (number of positions, len(POSITION_PLANES), rows, cols) with the planes of
+        POSITION_PLANES,
+        e.g. stacked squaresToPlanes() results
+    :param findSafe: Whether to find safe tiles as well as mines like getAllFreeNeighbours() (default: True)
+    :param iterations: Maximum number of rounds, None to repeat until nothing new is found (default: None)
+    :param chunkSize: Number of positions worked on at once (default: DEDUCTION_CHUNK_SIZE)
+    :return: Tuple (forcedMines, forcedSafe) of boolean arrays of shape (number of positions, rows, cols) with the
+        hidden tiles proven to be mines that weren't flagged yet and the hidden tiles proven to be safe that weren't
+        marked safe yet
+    """
+    planes = np.asarray(planes)
+    forcedMines = np.zeros((len(planes),) + planes.shape[2:], dtype=bool)
+    forcedSafe = np.zeros_like(forcedMines)
+    for start in range(0, len(planes), chunkSize):
+        chunk = planes[start:start + chunkSize]
+        values = chunk[:, 0].astype(np.uint8)
+        visible = chunk[:, 1].astype(bool)
+        flagged = ~visible & chunk[:, 2].astype(bool)
+        markedSafe = ~visible & ~flagged & chunk[:, 3].astype(bool)
+        allMines = flagged.copy()
+        allUnknown = ~visible & ~flagged & ~markedSafe
+        # Working arrays of the positions that changed in the last round, shrunk as positions stop changing
+        active = np.arange(len(chunk))
+        numbered = visible & (values > 0) & (values < 9)
+        mines = allMines.copy()
+        unknown = allUnknown.copy()
+        rounds = 0
+        while len(active) and (iterations is None or rounds < iterations):
+            rounds += 1
+            # Mines are counted in the low 4 bits and unknown tiles in the high 4 bits, so one pass counts both
+            counts = countNeighbours(mines.view(np.uint8) + (unknown.view(np.uint8) << 4))
+            mineCounts = counts & 15
+            unknownCounts = counts >> 4
+            checked = numbered & (unknownCounts > 0)
+            rules = (checked & (values == mineCounts + unknownCounts)).view(np.uint8)
+            if findSafe:
+                rules += (checked & (values == mineCounts)).view(np.uint8) << 4
+            # Same encoding for the numbers around every tile whose mine or safe tile rule applies
+            hits = countNeighbours(rules)
+            mines |= unknown & ((hits & 15) > 0)
+            unknown &= hits == 0
+            # A rule only applies to a number with unknown tiles around it, so it always finds new tiles
+            changed = rules.any(axis=(1, 2))
+            if not changed.all():
+                finished = ~changed
+                allMines[active[finished]] = mines[finished]
+                allUnknown[active[finished]] = unknown[finished]
+                active, values, numbered, mines, unknown = \
+                    active[changed], values[changed], numbered[changed], mines[changed], unknown[changed]
+        allMines[active] = mines
+        allUnknown[active] = unknown
+        forcedMines[start:start + chunkSize] = allMines & ~flagged
+        forcedSafe[start:start + chunkSize] = ~visible & ~allMines & ~allUnknown & ~markedSafe
+    return forcedMines, forcedSafe
+
+
+def analyzeCorpus(path, chunkSize=CHUNK_SIZE):
+    """
+    Computes boardStatistics() for a stored board corpus a chunk at a time, so the corpus doesn't have to fit in memory
+    :param path: Path of a .npy file with an array of shape (number of boards, rows, cols)
+    :param chunkSize: Number of boards analyzed at once (default: CHUNK_SIZE)
+    :return: Dictionary of statistic name to array with one value per board of the corpus
+    """
+    corpus = np.load(path, mmap_mode='r')
+    chunks = {name: [] for name in STATISTICS}
+    for start in range(0, corpus.shape[0], chunkSize):
+        statistics = boardStatistics(np.asarray(corpus[start:start + chunkSize]))
+        for name in STATISTICS:
+            chunks[name].append(statistics[name])
+    return {name: np.concatenate(values) if values else np.zeros(0) for name, values in chunks.items()}
+
+
+def generateCorpus(path, count, rows, cols, bombs, seed=None, chunkSize=CHUNK_SIZE):
+    """
+    Generates a board corpus straight into a .npy file a chunk at a time
+    :param path: Path of the .npy file to write
+    :param count: Number of boards
+    :param rows: Rows of every board
+    :param cols: Columns of every board
+    :param bombs: Number of bombs/mines on every board
+    :param seed: Seed of the numpy random generator (default: None)
+    :param chunkSize: Number of boards generated at once (default: CHUNK_SIZE)
+    """
+    corpus = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(count, rows, cols))
+    seeds = np.random.SeedSequence(seed).spawn((count + chunkSize - 1) // chunkSize)
+    for chunk, start in enumerate(range(0, count, chunkSize)):
+        size = min(chunkSize, count - start)
+        corpus[start:start + size] = generateBoards(size, rows, cols, bombs, seeds[chunk])
+    corpus.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Batch statistics of Minesweeper boards")
+    commands = parser.add_subparsers(dest='command', required=True)
+    generateParser = commands.add_parser('generate', help="Generate a board corpus")
+    generateParser.add_argument('path', help="Path of the .npy file to write")
+    generateParser.add_argument('--count', type=int, required=True, help="Number of boards")
+    generateParser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='hard')
+    generateParser.add_argument('--seed', type=int, help="Seed for generating the boards")
+    statsParser = commands.add_parser('stats', help="Compute statistics of a board corpus")
+    statsParser.add_argument('path', help="Path of the .npy corpus")
+    statsParser.add_argument('--out', help="Write the statistics of every board to this CSV file")
+    for commandParser in (generateParser, statsParser):
+        commandParser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help="Boards processed at once")
+    args = parser.parse_args()
+
+    startTime = time.perf_counter()
+    if args.command == 'generate':
+        rows, cols, bombs = DIFFICULTIES[args.difficulty]
+        generateCorpus(args.path, args.count, rows, cols, bombs, args.seed, args.chunk)
+        print("Generated", args.count, "boards in", round(time.perf_counter() - startTime, 3), "seconds")
+    else:
+        statistics = analyzeCorpus(args.path, args.chunk)
+        seconds = time.perf_counter() - startTime
+        print("Analyzed", len(statistics['threeBV']), "boards in", round(seconds, 3), "seconds")
+        for name in STATISTICS:
+            values = statistics[name]
+            if len(values):
+                print(name + ":", "mean", round(float(values.mean()), 3), "min", values.min(), "max", values.max())
+        if args.out:
+            np.savetxt(args.out, np.column_stack([statistics[name] for name in STATISTICS]), delimiter=',',
+                       header=','.join(STATISTICS), comments='', fmt='%g')
@@ -0,0 +1,244 @@
+"""
+Exports labelled positions from games the helper AI plays against itself, e.g. to train move prediction models.
+Every position a move is made from is a sample, with the planes of squaresToPlanes() as input and labels from the
+true board and from the solver, stored in the arrays named in DATASET_SCHEMA.
+Games are played in worker processes and written in order to shards of compressed .npz files, one shard per
+shardGames games, next to a manifest.json that lists the finished shards. Running the export again with the same
+settings continues after the last finished shard:
+    python DatasetExporter.py dataset --games 10000 --difficulty hard --seed 1
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from BatchAnalysis import POSITION_PLANES, squaresToPlanes, trivialDeductions
+from Minesweeper import DIFFICULTIES, GameState, SolverBudget, countFrontierSolutions, getMineConfigurations
+
+# Version of the schema below, stored in the manifest so files of different versions are never mixed
+SCHEMA_VERSION = 2
+
+# Array name to (dtype, shape) of every shard, where 'samples', 'rows' and 'cols' are filled in per dataset
+DATASET_SCHEMA = {
+    'planes': ('uint8', ('samples', len(POSITION_PLANES), 'rows', 'cols')),  # Position planes of squaresToPlanes()
+    'mines': ('bool', ('samples', 'rows', 'cols')),  # True board, i.e. Square.val == 9
+    'forcedMines': ('bool', ('samples', 'rows', 'cols')),  # Hidden tiles proven to be mines, not yet flagged
+    'forcedSafe': ('bool', ('samples', 'rows', 'cols')),  # Hidden tiles proven to be safe
+    'probability': ('float32', ('samples', 'rows', 'cols')),  # Mine probability of hidden unknown tiles else NaN
+    'exact': ('bool', ('samples',)),  # Whether all solutions were counted, else only trivial rules were applied
+    'game': ('int64', ('samples',)),  # Index of the game, its seed is the dataset's base seed + index
+    'move': ('int32', ('samples',)),  # Number of moves made in the game before the position
+}
+
+# Games per shard, bounds the memory used as a shard is kept in memory until it is written
+SHARD_GAMES = 50
+
+# Search nodes countFrontierSolutions() may visit to label a single position (about a second),
+# a node budget instead of a time budget so that every game only depends on its seed
+LABEL_NODE_BUDGET = 300000
+
+
+def labelPosition(listOfSquares):
+    """
+    Function to compute the solver labels of a position
+    :param listOfSquares: List of all Square Objects of the game
+    :return: Tuple of planes, forcedMines, forcedSafe and probability arrays as in DATASET_SCHEMA and exact
+    """
+    planes = squaresToPlanes(listOfSquares)
+    probability = np.full(planes.shape[1:], np.nan, dtype=np.float32)
+    frontierCount = countFrontierSolutions(listOfSquares, SolverBudget(nodes=LABEL_NODE_BUDGET))
+    if frontierCount is not None and frontierCount['configurations']:
+        configurations = frontierCount['configurations']
+        # Forced tiles from the exact counts, float32 rounds probabilities close to 0 or 1
+        forcedMines = np.zeros(planes.shape[1:], dtype=bool)
+        forcedSafe = np.zeros(planes.shape[1:], dtype=bool)
+        for (i, j), mineWays in getMineConfigurations(frontierCount).items():
+            probability[i, j] = mineWays / configurations
+            forcedMines[i, j] = mineWays == configurations
+            forcedSafe[i, j] = mineWays == 0
+        return planes, forcedMines, forcedSafe, probability, True
+    # Without the counts only the trivial rules can prove tiles
+    forcedMines, forcedSafe = trivialDeductions(planes[np.newaxis])
+    return planes, forcedMines[0], forcedSafe[0], probability, False
+
+
+def playGame(rows, cols, bombs, seed, game=0):
+    """
+    Worker process function playing a single game and labelling every position a move is made from.
+    The first move explores the centre tile. After that all proven mines are flagged and all proven safe tiles are
+    explored together as one move, or if there are none the tile least likely to be a mine is explored
+    (a random hidden tile if the probabilities aren't known).
+    :param rows: Rows of the board
+    :param cols: Columns of the board
+    :param bombs: Number of bombs/mines on the board
+    :param seed: Seed of the game
+    :param game: Index of the game stored with its samples (default: 0)
+    :return: Dictionary of the arrays of DATASET_SCHEMA for all samples of the game
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        state = GameState(rows, cols, bombs, seed)
+        rng = random.Random(seed)
+        state.reveal(rows // 2, cols // 2)
+        samples = {name: [] for name in DATASET_SCHEMA}
+        move = 1
+        while state.status == 'playing':
+            planes, forcedMines, forcedSafe, probability, exact = labelPosition(state.listOfSquares)
+            for name, value in (('planes', planes), ('forcedMines', forcedMines), ('forcedSafe', forcedSafe),
+                                ('probability', probability), ('exact', exact), ('game', game), ('move', move)):
+                samples[name].append(value)
+            samples['mines'].append(np.array([[square.val == 9 for square in row] for row in state.listOfSquares]))
+
+            for i, j in zip(*np.nonzero(forcedMines)):
+                state.listOfSquares[i][j].flagAI = True
+            if forcedSafe.any():
+                for i, j in zip(*np.nonzero(forcedSafe)):
+                    state.reveal(i, j)
+            else:
+                unknown = (planes[1] == 0) & (planes[2] == 0) & (planes[3] == 0) & ~forcedMines
+                if not unknown.any():
+                    break
+                if exact:
+                    # Lowest probability first, ties broken by the index of the tile
+                    guess = np.unravel_index(np.argmin(np.where(unknown, probability, np.inf)), unknown.shape)
+                else:
+                    guess = rng.choice(list(zip(*np.nonzero(unknown))))
+                state.reveal(guess[0], guess[1])
+            move += 1
+    sizes = {'samples': move - 1, 'rows': rows, 'cols': cols}
+    return {name: np.array(values, dtype=DATASET_SCHEMA[name][0]).reshape(
+        [sizes.get(size, size) for size in DATASET_SCHEMA[name][1]]) for name, values in samples.items()}
+
+
+def selfPlayGames(rows, cols, bombs, baseSeed, firstGame, lastGame, processes=None, window=SHARD_GAMES):
+    """
+    Generator playing games with playGame() in worker processes and yielding them in order.
+    Games are handed out a window at a time and the next window is played while the last one is consumed,
+    so at most two windows of games are in memory.
+    :param rows: Rows of every board
+    :param cols: Columns of every board
+    :param bombs: Number of bombs/mines on every board
+    :param baseSeed: Seed of game 0, game 'n' has seed baseSeed + n
+    :param firstGame: Index of the first game to play
+    :param lastGame: Index after the last game to play
+    :param processes: Number of worker processes, None for one per CPU, 1 to play in this process (default: None)
+    :param window: Number of games handed out at once (default: SHARD_GAMES)
+    :return: Generator of (game index, samples dictionary of playGame())
+    """
+    arguments = [(rows, cols, bombs, baseSeed + game, game) for game in range(firstGame, lastGame)]
+    if processes == 1:
+        for game, argument in zip(range(firstGame, lastGame), arguments):
+            yield game, playGame(*argument)
+        return
+    with multiprocessing.Pool(processes) as workers:
+        pending = workers.starmap_async(playGame, arguments[:window])
+        for start in range(0, len(arguments), window):
+            results = pending.get()
+            if start + window < len(arguments):
+                pending = workers.starmap_async(playGame, arguments[start + window:start + 2 * window])
+            for offset, samples in enumerate(results):
+                yield firstGame + start + offset, samples
+
+
+def readManifest(directory, settings):
+    """
+    Helper function to read the manifest of a dataset being exported, or start a new one
+    :param directory: Directory of the dataset
+    :param settings: Dictionary of the settings of the export, must match those of an existing manifest
+    :return: Manifest dictionary with the settings and the list of finished 'shards'
+    """
+    path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(path):
+        return dict(settings, shards=[])
+    with open(path) as file:
+        manifest = json.load(file)
+    for key, value in settings.items():
+        if key != 'games' and manifest.get(key) != value:
+            raise ValueError("Dataset in " + directory + " was exported with " + key + " = " +
+                             str(manifest.get(key)) + ", not " + str(value))
+    manifest['games'] = settings['games']
+    return manifest
+
+
+def writeAtomically(path, write, mode='w'):
+    """
+    Helper function to write a file so that it is either complete or not there at all
+    :param path: Path of the file
+    :param write: Function writing the file object it is given
+    :param mode: Mode to open the file with (default: 'w')
+    """
+    temporaryPath = path + '.tmp'
+    with open(temporaryPath, mode) as file:
+        write(file)
+    os.replace(temporaryPath, path)
+
+
+def exportDataset(directory, games, rows, cols, bombs, baseSeed=0, processes=None, shardGames=SHARD_GAMES):
+    """
+    Function to export the samples of self-play games to shards, continuing an interrupted export
+    :param directory: Directory to write the shards and manifest.json to
+    :param games: Total number of games of the dataset
+    :param rows: Rows of every board
+    :param cols: Columns of every board
+    :param bombs: Number of bombs/mines on every board
+    :param baseSeed: Seed of game 0, game 'n' has seed baseSeed + n (default: 0)
+    :param processes: Number of worker processes, None for one per CPU (default: None)
+    :param shardGames: Number of games per shard (default: SHARD_GAMES)
+    :return: Manifest dictionary
+    """
+    os.makedirs(directory, exist_ok=True)
+    settings = {'schemaVersion': SCHEMA_VERSION, 'schema': {name: [dtype, list(shape)] for name, (dtype, shape)
+                                                            in DATASET_SCHEMA.items()},
+                'rows': rows, 'cols': cols, 'bombs': bombs, 'baseSeed': baseSeed, 'shardGames': shardGames,
+                'games': games}
+    manifest = readManifest(directory, settings)
+    firstGame = manifest['shards'][-1]['lastGame'] if manifest['shards'] else 0
+    shard = []
+    for game, samples in selfPlayGames(rows, cols, bombs, baseSeed, firstGame, games, processes, shardGames):
+        shard.append(samples)
+        if len(shard) == shardGames or game == games - 1:
+            arrays = {name: np.concatenate([samples[name] for samples in shard]) for name in DATASET_SCHEMA}
+            name = 'shard_' + str(len(manifest['shards'])).zfill(5) + '.npz'
+            writeAtomically(os.path.join(directory, name), lambda file: np.savez_compressed(file, **arrays), 'wb')
+            manifest['shards'].append({'file': name, 'firstGame': game + 1 - len(shard), 'lastGame': game + 1,
+                                       'samples': len(arrays['game'])})
+            writeAtomically(os.path.join(directory, 'manifest.json'),
+                            lambda file: json.dump(manifest, file, indent=1))
+            print("Wrote", name, "with", len(arrays['game']), "samples of games", game + 1 - len(shard), "to", game)
+            shard = []
+    return manifest
+
+
+def readDataset(directory):
+    """
+    Generator reading an exported dataset a shard at a time
+    :param directory: Directory with manifest.json and the shards
+    :return: Generator of dictionaries of the arrays of DATASET_SCHEMA, one per shard
+    """
+    with open(os.path.join(directory, 'manifest.json')) as file:
+        manifest = json.load(file)
+    for shard in manifest['shards']:
+        with np.load(os.path.join(directory, shard['file'])) as arrays:
+            yield {name: arrays[name] for name in arrays.files}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export labelled positions of self-play games")
+    parser.add_argument('directory', help="Directory to write the dataset to")
+    parser.add_argument('--games', type=int, required=True, help="Total number of games")
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='hard')
+    parser.add_argument('--seed', type=int, default=0, help="Seed of game 0, game n has seed + n")
+    parser.add_argument('--processes', type=int, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument('--shard-games', type=int, default=SHARD_GAMES, help="Games per shard")
+    args = parser.parse_args()
+
+    startTime = time.perf_counter()
+    rows, cols, bombs = DIFFICULTIES[args.difficulty]
+    result = exportDataset(args.directory, args.games, rows, cols, bombs, args.seed, args.processes,
+                           args.shard_games)
+    print("Dataset has", sum(shard['samples'] for shard in result['shards']), "samples in",
+          len(result['shards']), "shards, took", round(time.perf_counter() - startTime, 3), "seconds")
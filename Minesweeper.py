@@ -1,4 +1,14 @@
-from random import randint
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import signal
+import time
+from collections import deque
+from contextlib import redirect_stdout
 
 from constraint import *
 
@@ -7,8 +17,6 @@ import pygame
 # Width and Height of Images representing each Square/Tile
 IMG_SIZE = 40
 
-pygame.init()
-
 # Number of Rows, Columns and Mines for EASY Difficulty
 EASY_ROWS = 8
 EASY_COLS = 10
@@ -24,6 +32,52 @@ HARD_ROWS = 20
 HARD_COLS = 24
 HARD_MINES = 99
 
+# Rows, Columns and Mines of every difficulty by name, for the command line tools and the server
+DIFFICULTIES = {'easy': (EASY_ROWS, EASY_COLS, EASY_MINES),
+                'medium': (MEDIUM_ROWS, MEDIUM_COLS, MEDIUM_MINES),
+                'hard': (HARD_ROWS, HARD_COLS, HARD_MINES)}
+
+# Directory where pre-generated no-guess boards are kept and how many boards to keep per difficulty
+NO_GUESS_POOL_DIR = ".boardpool"
+NO_GUESS_POOL_SIZE = 5
+
+# Seconds the helper AI may spend on a single Solve using CSP request
+HELPER_TIME_BUDGET = 5.0
+
+# Search nodes the helper AI may visit on each step while checking a no-guess board (about a second),
+# a node budget so that whether a board is accepted doesn't depend on the machine's load
+NO_GUESS_NODE_BUDGET = 80000
+
+# Seconds game() waits for the pool's workers to generate a no-guess board, how often it checks the pool meanwhile
+# and how many boards it tries itself after that before falling back to a board that may need guessing
+NO_GUESS_POOL_WAIT = 60.0
+NO_GUESS_POOL_POLL_INTERVAL = 0.1
+NO_GUESS_MAX_ATTEMPTS = 100
+
+# Maximum number of open states of the frontier counting dynamic programming before it gives up
+FRONTIER_DP_MAX_STATES = 200000
+
+# Phases every frame of game() is split into by PerfMonitor: handling input events and solver messages,
+# blitting the tiles, drawing buttons and texts and updating the display.
+# Number of recent frames averaged by its HUD and columns of its CSV log.
+PERF_PHASES = ('events', 'tiles', 'text', 'display')
+PERF_WINDOW = 60
+PERF_LOG_COLUMNS = ('frame', 'time', 'frameMs', 'eventsMs', 'tilesMs', 'textMs', 'displayMs', 'lagMs', 'clickMs',
+                    'helper', 'helperMs')
+
+# Seconds, number of chains, fraction of time thrown away as burn-in and constraint violation weight
+# of the Monte Carlo sampler used to suggest a guess when no tile is certain
+SAMPLER_TIME_BUDGET = 2.0
+SAMPLER_CHAINS = 4
+SAMPLER_BURN_IN = 0.2
+SAMPLER_BETA = 2.5
+
+# Two-sided 95% quantiles of Student's t distribution for 1 to 30 degrees of freedom, for the sampler's
+# confidence intervals from the spread of few chains (the normal quantile 1.96 is used beyond)
+T_QUANTILES_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                  2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                  2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
 
 class Button:
     """Class for Button UI"""
@@ -150,30 +204,33 @@ class Square:  # Every piece in the board
             return 'ERROR: No Items set.'
 
 
-def mine(rows, cols, bombs):
+def mine(rows, cols, bombs, rng=None):
     """
     Creates a 2D array for mine field
     :param rows: Rows of array/Minefield
     :param cols: Columns of array/Minefield
     :param bombs: Number of bombs/mines to place
+    :param rng: random.Random to place the bombs with, the global random functions are used if None (default: None)
     :return: Array of size 'rows' x 'cols' with 'bombs' number of 9's and correct hint number for a minesweeper game
     """
     table = [
         [0] * cols for i in range(rows)]  # Array of size 'rows' x 'cols' with all elements being 0
-    table = addBombs(table, bombs)
+    table = addBombs(table, bombs, rng=rng)
     table = changeTable(table)
     return table
 
 
-def addBombs(table, bombs, safe_indices=None):
+def addBombs(table, bombs, safe_indices=None, rng=None):
     """
     Adds bombs represented by 9 to the table
     safe_indices is provided so that the index of user's first clicked tile and its surrounding don't contain a mine
     :param table: 2D array
     :param bombs: Number of bombs to add to the table
     :param safe_indices: Indices where bombs shouldn't be placed (default: None)
+    :param rng: random.Random to place the bombs with, the global random functions are used if None (default: None)
     :return: 2D array with correct number of new bombs(9) added to the argument array
     """
+    randint = rng.randint if rng is not None else random.randint
     for _ in range(bombs):
         is_bomb = False
         while not is_bomb:
@@ -272,14 +329,17 @@ def getHowManyAndWhereAround(listOfSquares, row, col, checkAttribute, checkValue
     return count, valueLoc
 
 
-def restart(rows, cols, bombs):
+def restart(rows, cols, bombs, pool=None, recorder=None, perf=None):
     """
     Function to restart the game
     :param rows: Rows of new Minesweeper game
     :param cols: Columns of new Minesweeper game
     :param bombs: Number of bombs in new game
+    :param pool: BoardPool to take a no-guess board from (default: None)
+    :param recorder: GameRecorder to record the new game with (default: None)
+    :param perf: PerfMonitor to measure the new game's frames with (default: None)
     """
-    game(rows, cols, bombs)
+    game(rows, cols, bombs, pool, recorder=recorder, perf=perf)
 
 
 def openGame(listOfSquares, square):
@@ -319,6 +379,249 @@ def updateListOfSquares(rows, cols, board):
 """ The helper AI part begins from here."""
 
 
+class SolverBudget:
+    """
+    Class for a deadline and/or search node budget shared by the helper AI tiers.
+    Tiers stop searching once the budget is used up and keep the hints they have already proven,
+    exhausted is then set so the caller knows the tiers didn't complete.
+    """
+
+    def __init__(self, seconds=None, nodes=None):
+        """
+        :param seconds: Seconds the tiers may take from now on, unlimited if None (default: None)
+        :param nodes: Number of search nodes the tiers may visit, unlimited if None (default: None)
+        """
+        self.deadline = time.monotonic() + seconds if seconds is not None else None
+        self.nodes = nodes
+        self.usedNodes = 0
+        self.exhausted = False
+
+    def expired(self):
+        """
+        Method to check if the budget is used up
+        :return: True if the deadline passed or all search nodes were used else False
+        """
+        if not self.exhausted:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                self.exhausted = True
+            elif self.nodes is not None and self.usedNodes > self.nodes:
+                self.exhausted = True
+        return self.exhausted
+
+    def spend(self, nodes=1):
+        """
+        Method to use up search nodes
+        :param nodes: Number of search nodes visited (default: 1)
+        :return: True if the budget is now used up else False
+        """
+        self.usedNodes += nodes
+        return self.expired()
+
+    def secondsLeft(self):
+        """
+        Method to get the time left until the deadline
+        :return: Seconds left, 0 once the deadline passed, or None if there is no deadline
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+
+class BudgetExhausted(Exception):
+    """Raised by BudgetConstraint to stop the search of a Problem when its SolverBudget is used up"""
+
+
+class BudgetConstraint(Constraint):
+    """
+    Constraint that is always satisfied but spends a search node of a SolverBudget every time it is checked.
+    Added over all variables of a Problem so that it is checked at every assignment of the backtracking search.
+    """
+
+    def __init__(self, budget):
+        """
+        :param budget: SolverBudget to spend
+        """
+        self.budget = budget
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False):
+        if self.budget.spend():
+            raise BudgetExhausted()
+        return True
+
+
+class ProbeConstraint(Constraint):
+    """
+    Constraint that forbids a single value of a single variable, or nothing if variable is None.
+    Added over all variables of a Problem so that the probed variable can be changed between searches.
+    """
+
+    def __init__(self):
+        self.variable = None
+        self.forbiddenValue = None
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False):
+        if self.variable is None:
+            return True
+        if self.variable in assignments:
+            return assignments[self.variable] != self.forbiddenValue
+        if forwardcheck and self.forbiddenValue in domains[self.variable]:
+            domains[self.variable].hideValue(self.forbiddenValue)
+            return bool(domains[self.variable])
+        return True
+
+
+def findConsistentValues(constraintProblem, variables, budget=None):
+    """
+    Helper function to find the variables that have the same value in all solutions of a Problem without generating
+    all of them.
+    For every solution found, a bit is set in seenZero or seenOne for each variable. A variable seen with both values
+    is mixed and is dropped from consideration.
+    Solutions come lazily from getSolutionIter(), first up to one per variable from a single search, which settles
+    Problems with few solutions. Depth-first search keeps early variables fixed for a long time, so after that every
+    variable that is still undecided is probed by searching for a solution with the value it wasn't seen with.
+    If one is found, it usually mixes many other variables too. If none exists, the variable is proven consistent.
+    So a Problem with millions of solutions takes at most about two searches per variable, and searching stops as
+    soon as no variable is left undecided.
+    :param constraintProblem: Problem with all variables and constraints added
+    :param variables: List of all variables of the Problem
+    :param budget: SolverBudget to spend or None for no budget (default: None)
+    :return: Dictionary of variable to value for every variable with the same value in all solutions,
+        empty if there is no solution or None if the budget was used up before it was proven
+    """
+    if budget is not None:
+        if budget.expired():
+            return None
+        constraintProblem.addConstraint(BudgetConstraint(budget), variables)
+    probe = ProbeConstraint()
+    constraintProblem.addConstraint(probe, variables)
+    bits = {variable: 1 << t for t, variable in enumerate(variables)}
+    seenZero = 0
+    seenOne = 0
+    undecided = list(variables)
+    consistentValues = {}
+
+    def see(solution):
+        nonlocal seenZero, seenOne, undecided
+        for variable in undecided:
+            if solution[variable]:
+                seenOne |= bits[variable]
+            else:
+                seenZero |= bits[variable]
+        mixed = seenZero & seenOne
+        if mixed:
+            undecided = [variable for variable in undecided if not mixed & bits[variable]]
+
+    try:
+        solutions = constraintProblem.getSolutionIter()
+        for count, solution in enumerate(solutions, 1):
+            see(solution)
+            if not undecided or count == len(variables):
+                break
+        else:
+            # All solutions were seen
+            return {variable: 1 if seenOne & bits[variable] else 0 for variable in undecided
+                    if (seenZero | seenOne) & bits[variable]}
+        while undecided:
+            probe.variable = undecided.pop(0)
+            probe.forbiddenValue = 1 if seenOne & bits[probe.variable] else 0
+            solution = next(constraintProblem.getSolutionIter(), None)
+            if solution is None:
+                consistentValues[probe.variable] = probe.forbiddenValue
+            else:
+                see(solution)
+    except BudgetExhausted:
+        return None
+    finally:
+        probe.variable = None
+    return consistentValues
+
+
+def splitConstraints(constraintList):
+    """
+    Helper function to split constraints into groups that share no variables with each other.
+    Such groups can be solved separately, which keeps a search from repeating the work on one group
+    for every combination of values of the others.
+    :param constraintList: List of constraints made by getConstraints()
+    :return: List of lists of constraints, each sorted by the index of their Square
+    """
+    groupOf = {}  # Variable to the index of the group it is in
+    groups = []
+    for constraint in constraintList:
+        c_Index, c_Value, c_Variables = constraint
+        joined = sorted({groupOf[variable] for variable in c_Variables if variable in groupOf})
+        if joined:
+            group = joined[0]
+            for other in joined[1:]:
+                for otherConstraint in groups[other]:
+                    for variable in otherConstraint[2]:
+                        groupOf[variable] = group
+                groups[group] += groups[other]
+                groups[other] = []
+        else:
+            group = len(groups)
+            groups.append([])
+        groups[group].append(constraint)
+        for variable in c_Variables:
+            groupOf[variable] = group
+    return [sorted(group, key=lambda constraint: constraint[0]) for group in groups if group]
+
+
+def propagateTrivialRules(listOfSquares, worklist=None, findSafe=True):
+    """
+    Applies the Straight-forward Logic of AMNs and AFNs until no more tiles can be found.
+    Keeps a worklist of visible numbered Squares whose surroundings changed, so that after marking a tile
+    only the Squares around it are checked again instead of the whole board.
+    A numbered Square with value 'n', 'm' flagAI tiles and 'u' unknown tiles (hidden, not flagAI, not safe) around it
+        has only mines around it if n - m == u, and has only safe tiles around it if n == m.
+    :param listOfSquares: List of all Square Objects in the current game
+    :param worklist: Iterable of (i, j) indices of Squares to check first, whole board if None (default: None)
+    :param findSafe: Whether to find AFNs as well as AMNs (default: True)
+    :return: Tuple (foundAMN, foundAFN) of booleans telling if new AMNs and AFNs were found
+    """
+    if worklist is None:
+        worklist = [(sq.i, sq.j) for row in listOfSquares for sq in row if sq.visible and sq.val != 0]
+    worklist = deque(worklist)
+    inWorklist = set(worklist)
+    foundAMN = False
+    foundAFN = False
+    while worklist:
+        i, j = worklist.popleft()
+        inWorklist.discard((i, j))
+        square = listOfSquares[i][j]
+        if not square.visible or square.val == 0 or square.val == 9:
+            continue
+        mines = 0
+        unknowns = []
+        for ti, tj in getSurroundingIndices(listOfSquares, i, j):
+            neighbour = listOfSquares[ti][tj]
+            if neighbour.visible:
+                continue
+            if neighbour.flagAI:
+                mines += 1
+            elif not neighbour.safe:
+                unknowns.append(neighbour)
+        if not unknowns:
+            continue
+        if square.val - mines == len(unknowns):
+            for neighbour in unknowns:
+                neighbour.flagAI = True
+            foundAMN = True
+        elif findSafe and square.val == mines:
+            for neighbour in unknowns:
+                neighbour.safe = True
+                neighbour.flag = False
+            foundAFN = True
+        else:
+            continue
+        # Squares around the newly marked tiles may now have a deduction
+        for neighbour in unknowns:
+            for ti, tj in getSurroundingIndices(listOfSquares, neighbour.i, neighbour.j):
+                if listOfSquares[ti][tj].visible and (ti, tj) not in inWorklist:
+                    worklist.append((ti, tj))
+                    inWorklist.add((ti, tj))
+    return foundAMN, foundAFN
+
+
 def getAllMineNeighbours(listOfSquares):
     """
     Shows All Mine Neighbours (AMNs). Straight-forward Logic.
@@ -328,17 +631,7 @@ def getAllMineNeighbours(listOfSquares):
     :param listOfSquares: List of all Square Objects in the current game
     :return: True if new AMNs found else False
     """
-    foundAMN = False
-    for i in listOfSquares:
-        for j in i:
-            if j.visible and (j.val != 0):
-                if j.val == getHowManyAndWhereAround(listOfSquares, j.i, j.j, ['visible'], [False])[0]:
-                    for index in getHowManyAndWhereAround(listOfSquares, j.i, j.j, ['visible'], [False])[1]:
-                        if not listOfSquares[index[0]][index[1]].flagAI:
-                            listOfSquares[index[0]][index[1]].flagAI = True
-                            foundAMN = True
-                        # print("Mine at Index:", index)
-    return foundAMN
+    return propagateTrivialRules(listOfSquares, findSafe=False)[0]
 
 
 def getAllFreeNeighbours(listOfSquares):
@@ -346,28 +639,12 @@ def getAllFreeNeighbours(listOfSquares):
     Shows All Free Neighbours (AFNs). Straight-forward Logic.
     AFNs are tiles that certainly do NOT contain a mine because the number of correctly flagged tiles around a
     Square/tile is equal to its value(hint) and some other tiles are still present around the square/tile.
+    AMNs are found along the way and both are chained by propagateTrivialRules() until nothing new is found.
     Called by Show All Free Neighbours Button i.e. AFN_Button
     :param listOfSquares: List of all Square Objects in the current game
     :return: True if new AFNs found else False
     """
-    foundAFN = False
-    getAllMineNeighbours(listOfSquares)
-    for i in listOfSquares:
-        for j in i:
-            if j.visible and (j.val != 0):
-                if j.val == getHowManyAndWhereAround(listOfSquares, j.i, j.j, ['flagAI'], [True])[0]:
-                    mineIndices = getHowManyAndWhereAround(
-                        listOfSquares, j.i, j.j, ['flagAI'], [True])[1]
-                    for index in getSurroundingIndices(listOfSquares, j.i, j.j):
-                        if index not in mineIndices:
-                            ti, tj = index
-                            if not (listOfSquares[ti][tj].visible or listOfSquares[ti][tj].flagAI or
-                                    listOfSquares[ti][tj].safe):
-                                listOfSquares[ti][tj].safe = True
-                                listOfSquares[ti][tj].flag = False
-                                foundAFN = True
-                                # print("Safe tile at index:", index)
-    return foundAFN
+    return propagateTrivialRules(listOfSquares)[1]
 
 
 def createConstraintEquation(listOfSquares, square):
@@ -436,7 +713,7 @@ def takeActions(listOfSquares):
     return tookActions
 
 
-def cspSolver(listOfSquares):
+def cspSolver(listOfSquares, budget=None):
     """
     Function to find safe and mine tiles by formulating current game state as a Constraint Satisfaction Problem and
     generating necessary solutions.
@@ -449,21 +726,41 @@ def cspSolver(listOfSquares):
         Constraint: Variable around a visible square with value 'n' should sum to 'n'
                     If 'm' hidden tiles are known to be mines then
                         Variable around a visible square with value 'n' should sum to 'n-m'
-    This particular function initially checks two constraints with at least a common variable. Also known as
-        "Coupled Subsets CSP"
+    This particular function initially tries the Straight-Forward Logic of getAllFreeNeighbours()
+        and checks two constraints with at least a common variable using cspSolver2D().
     If it fails to find new safe/mine tiles, then it calls cspSolver3D() which may then call globalCSP().
     :param listOfSquares: List of all Square Objects in the current game
+    :param budget: SolverBudget shared by all the tiers, unlimited if None (default: None)
     :return: True if finds new safe and/or mine tiles using CSP else False
     """
-    foundConsistentSolution = False
     print("Trying Straight-Forward Logic.")
     foundConsistentSolution = getAllFreeNeighbours(listOfSquares)
+    foundConsistentSolution = cspSolver2D(listOfSquares, budget) or foundConsistentSolution
+    if not foundConsistentSolution:
+        return cspSolver3D(listOfSquares, budget=budget)
+    else:
+        return True
+
+
+def cspSolver2D(listOfSquares, budget=None):
+    """
+    Function to find safe and mine tiles by checking two constraints with at least a common variable. Also known as
+        "Coupled Subsets CSP"
+    CSP is modelled the same way as in cspSolver().
+    :param listOfSquares: List of all Square Objects in the current game
+    :param budget: SolverBudget to stop at, hints found before it is used up are kept (default: None)
+    :return: True if finds new safe and/or mine tiles else False
+    """
+    foundConsistentSolution = False
     print("Trying Coupled Subsets CSP.")
     constraintProblem = Problem()
     constraintList = getConstraints(listOfSquares)
     printTable(constraintList)
 
     for x in range(0, len(constraintList) - 1):
+        if budget is not None and budget.exhausted:
+            print("Ran out of budget in Coupled Subsets CSP.")
+            break
         for y in range(x + 1, len(constraintList)):
             constraintProblem.reset()
             constraint1 = constraintList[x]
@@ -478,37 +775,24 @@ def cspSolver(listOfSquares):
                 ExactSumConstraint(c1_Value), c1_Variables)
             constraintProblem.addConstraint(
                 ExactSumConstraint(c2_Value), c2_Variables)
-            solutions = constraintProblem.getSolutions()
-            # printTable(solutions)
+            consistentValues = findConsistentValues(constraintProblem, uniqueVariables, budget)
+            if consistentValues is None:
+                break
             # print("X:", x, "Y:", y)
-            if len(solutions) != 0:
-                for variable in uniqueVariables:
-                    firstVal = solutions[0][variable]
-                    print("\nValue in first found solution is",
-                          firstVal, "of variable", variable)
-                    isConsistent = True
-                    for solution in solutions[1:]:
-                        print("Value in another instance:", solution[variable])
-                        if solution[variable] != firstVal:
-                            isConsistent = False
-                            break
-                    if isConsistent:
-                        foundConsistentSolution = True
-                        print("Found consistent", variable,
-                              "with value", firstVal)
-                        decodedX = int(variable.split('_')[0])
-                        decodedY = int(variable.split('_')[1])
-                        if firstVal == 0:
-                            listOfSquares[decodedX][decodedY].safe = True
-                        if firstVal == 1:
-                            listOfSquares[decodedX][decodedY].flagAI = True
-    if not foundConsistentSolution:
-        return cspSolver3D(listOfSquares)
-    else:
-        return True
+            for variable, firstVal in consistentValues.items():
+                foundConsistentSolution = True
+                print("Found consistent", variable,
+                      "with value", firstVal)
+                decodedX = int(variable.split('_')[0])
+                decodedY = int(variable.split('_')[1])
+                if firstVal == 0:
+                    listOfSquares[decodedX][decodedY].safe = True
+                if firstVal == 1:
+                    listOfSquares[decodedX][decodedY].flagAI = True
+    return foundConsistentSolution
 
 
-def cspSolver3D(listOfSquares):
+def cspSolver3D(listOfSquares, cascade=True, budget=None):
     """
     Additional Function to find safe and mine tiles by formulating current game state as
     a Constraint Satisfaction Problem and
@@ -524,8 +808,11 @@ def cspSolver3D(listOfSquares):
     This particular function checks three (3) constraints say C1, C2 and C3
         if C1 and C2 share a common variable and C1 or C2 share a common variable with C3.
     Also, this function is ONLY called if cspSolver() fails to find any safe and/or mine tiles
-    If this function fails to find any new safe/mine tiles, it calls globalCSP() as a last ditch effort.
+    If this function fails to find any new safe/mine tiles, it calls frontierCountingCSP() which may then call
+        globalCSP() as a last ditch effort.
     :param listOfSquares: List of all Square Objects in the current game
+    :param cascade: Whether to call frontierCountingCSP() if no new safe/mine tiles are found (default: True)
+    :param budget: SolverBudget to stop at, hints found before it is used up are kept (default: None)
     :return: True if finds new safe and/or mine tiles using CSP else False
     """
     print("\nTrying 3 subsets CSP.")
@@ -534,7 +821,12 @@ def cspSolver3D(listOfSquares):
     printTable(constraintList)
     foundConsistentSolution = False
     for x in range(0, len(constraintList) - 2):
+        if budget is not None and budget.exhausted:
+            print("Ran out of budget in 3 subsets CSP.")
+            break
         for y in range(x + 1, len(constraintList) - 1):
+            if budget is not None and budget.exhausted:
+                break
             for z in range(y + 1, len(constraintList)):
                 constraintProblem.reset()
                 constraint1 = constraintList[x]
@@ -561,37 +853,27 @@ def cspSolver3D(listOfSquares):
                     ExactSumConstraint(c2_Value), c2_Variables)
                 constraintProblem.addConstraint(
                     ExactSumConstraint(c3_Value), c3_Variables)
-                solutions = constraintProblem.getSolutions()
-
-                if len(solutions) != 0:
-                    for variable in uniqueVariables:
-                        firstVal = solutions[0][variable]
-                        print("\nValue in first found solution is",
-                              firstVal, "of variable", variable)
-                        isConsistent = True
-                        for solution in solutions[1:]:
-                            print("Value in another instance:",
-                                  solution[variable])
-                            if solution[variable] != firstVal:
-                                isConsistent = False
-                                break
-                        if isConsistent:
-                            foundConsistentSolution = True
-                            print("Found consistent", variable,
-                                  "with value", firstVal)
-                            decodedX = int(variable.split('_')[0])
-                            decodedY = int(variable.split('_')[1])
-                            if firstVal == 0:
-                                listOfSquares[decodedX][decodedY].safe = True
-                            if firstVal == 1:
-                                listOfSquares[decodedX][decodedY].flagAI = True
-    if not foundConsistentSolution:
-        return globalCSP(listOfSquares)
+                consistentValues = findConsistentValues(constraintProblem, uniqueVariables, budget)
+                if consistentValues is None:
+                    break
+
+                for variable, firstVal in consistentValues.items():
+                    foundConsistentSolution = True
+                    print("Found consistent", variable,
+                          "with value", firstVal)
+                    decodedX = int(variable.split('_')[0])
+                    decodedY = int(variable.split('_')[1])
+                    if firstVal == 0:
+                        listOfSquares[decodedX][decodedY].safe = True
+                    if firstVal == 1:
+                        listOfSquares[decodedX][decodedY].flagAI = True
+    if not foundConsistentSolution and cascade:
+        return frontierCountingCSP(listOfSquares, budget)
     else:
-        return True
+        return foundConsistentSolution
 
 
-def globalCSP(listOfSquares):
+def globalCSP(listOfSquares, budget=None):
     """
     Additional Function to find safe and mine tiles by formulating current game state as
     a Constraint Satisfaction Problem and
@@ -609,22 +891,19 @@ def globalCSP(listOfSquares):
         if the number of flags to be placed is considered small enough. Currently it is less than or equal to 5.
         This constraint is a popular EndGame tactic in Minesweeper.
     This particular function tries to find solution/s satisfying all the constraints.
-    Also, this function is ONLY called if both cspSolver() and cspSolver3D fails to find any safe and/or mine tiles.
+    Also, this function is ONLY called if cspSolver() and cspSolver3D fail to find any safe and/or mine tiles
+    and frontierCountingCSP() couldn't count all solutions.
     NOTE: This is a final desperate attempt to find a consistent solution.
+    Unless the remaining mines constraint is added, groups of constraints that share no variables are solved
+    as separate Problems, and if the budget is used up the hints of the groups already solved are kept.
     :param listOfSquares: List of all Square Objects in the current game
+    :param budget: SolverBudget to stop at (default: None)
     :return: True if finds new safe and/or mine tiles using CSP else False
     """
     print("I'm using Global Solver now.")
-    constraintProblem = Problem()
     constraintList = getConstraints(listOfSquares)
     printTable(constraintList)
     foundConsistentSolution = False
-    allVariables = []
-    for constraint in constraintList:
-        c_Index, c_Value, c_Variables = constraint
-        allVariables += c_Variables
-        constraintProblem.addConstraint(
-            ExactSumConstraint(c_Value), c_Variables)
 
     nMines = 0
     nFlagged = 0
@@ -635,52 +914,1362 @@ def globalCSP(listOfSquares):
             if sq.flagAI:
                 nFlagged += 1
     if nMines - nFlagged <= 5:
-        for sRows in listOfSquares:
-            for sq in sRows:
-                if not sq.visible and not sq.flagAI and not sq.safe:
-                    allVariables.append(str(sq.i) + '_' + str(sq.j))
-
-    uniqueVariables = list(set(allVariables))
-    if nMines - nFlagged <= 5:
-        constraintProblem.addConstraint(
-            ExactSumConstraint(nMines - nFlagged), uniqueVariables)
-    constraintProblem.addVariables(uniqueVariables, [0, 1])
-
-    solutions = constraintProblem.getSolutions()
-    if len(solutions) != 0:
-
-        for variable in uniqueVariables:
-            firstVal = solutions[0][variable]
-            print("\nValue in first found solution is",
-                  firstVal, "of variable", variable)
-            isConsistent = True
-            for solution in solutions[1:]:
-                print("Value in another instance:", solution[variable])
-                if solution[variable] != firstVal:
-                    isConsistent = False
-                    break
-            if isConsistent:
-                foundConsistentSolution = True
-                print("Found consistent", variable, "with value", firstVal)
-                decodedX = int(variable.split('_')[0])
-                decodedY = int(variable.split('_')[1])
-                if firstVal == 0:
-                    listOfSquares[decodedX][decodedY].safe = True
-                if firstVal == 1:
-                    listOfSquares[decodedX][decodedY].flagAI = True
+        # The remaining mines constraint connects all hidden unknown cells
+        constraintGroups = [constraintList]
+    else:
+        constraintGroups = splitConstraints(constraintList)
+
+    for constraintGroup in constraintGroups:
+        constraintProblem = Problem()
+        allVariables = []
+        for constraint in constraintGroup:
+            c_Index, c_Value, c_Variables = constraint
+            allVariables += c_Variables
+            constraintProblem.addConstraint(
+                ExactSumConstraint(c_Value), c_Variables)
+        if nMines - nFlagged <= 5:
+            for sRows in listOfSquares:
+                for sq in sRows:
+                    if not sq.visible and not sq.flagAI and not sq.safe:
+                        allVariables.append(str(sq.i) + '_' + str(sq.j))
+
+        uniqueVariables = list(set(allVariables))
+        if nMines - nFlagged <= 5:
+            constraintProblem.addConstraint(
+                ExactSumConstraint(nMines - nFlagged), uniqueVariables)
+        constraintProblem.addVariables(uniqueVariables, [0, 1])
+
+        consistentValues = findConsistentValues(constraintProblem, uniqueVariables, budget)
+        if consistentValues is None:
+            print("Ran out of budget in Global Solver.")
+            break
+        for variable, firstVal in consistentValues.items():
+            foundConsistentSolution = True
+            print("Found consistent", variable, "with value", firstVal)
+            decodedX = int(variable.split('_')[0])
+            decodedY = int(variable.split('_')[1])
+            if firstVal == 0:
+                listOfSquares[decodedX][decodedY].safe = True
+            if firstVal == 1:
+                listOfSquares[decodedX][decodedY].flagAI = True
     if not foundConsistentSolution:
         return False
     else:
         return True
 
 
-def game(rows, cols, bombs):
+""" Frontier solution counting begins from here."""
+
+
+def getVariableIndex(variable):
+    """
+    Helper function to decode a CSP variable name
+    :param variable: Variable string 'i_j'
+    :return: [i, j] index of the Square the variable stands for
+    """
+    return [int(part) for part in variable.split('_')]
+
+
+def orderFrontierVariables(constraintList):
+    """
+    Orders the variables of the frontier along the boundary so that few constraints are open at any point.
+    Does a breadth first search over variables sharing a constraint, starting from and preferring
+    variables with few neighbours (Cuthill-McKee ordering), one connected component after another.
+    :param constraintList: List of constraint equation parameters made by getConstraints()
+    :return: List of all variables of the constraints in search order
+    """
+    neighbours = {}
+    for c_Index, c_Value, c_Variables in constraintList:
+        for variable in c_Variables:
+            neighbours.setdefault(variable, set()).update(c_Variables)
+    orderKey = lambda variable: (len(neighbours[variable]), variable)
+    order = []
+    seen = set()
+    for start in sorted(neighbours, key=orderKey):
+        if start in seen:
+            continue
+        seen.add(start)
+        toVisit = deque([start])
+        while toVisit:
+            variable = toVisit.popleft()
+            order.append(variable)
+            for neighbour in sorted(neighbours[variable] - seen, key=orderKey):
+                seen.add(neighbour)
+                toVisit.append(neighbour)
+    return order
+
+
+def countFrontierSolutions(listOfSquares, budget=None, maxStates=FRONTIER_DP_MAX_STATES):
+    """
+    Counts all mine layouts consistent with the current game state exactly without enumerating them.
+    The frontier variables are ordered along the boundary by orderFrontierVariables() and assigned one by one
+    (transfer matrix / path decomposition dynamic programming). The state after assigning the first 't' variables
+    is the partial sums of the constraints that are still open plus the number of mines placed so far,
+    so the work grows with the number of open constraints instead of the number of solutions.
+    A forward pass counts the ways to reach every state and a backward pass counts the ways to complete it,
+    each completion weighted by the number of ways to place the remaining mines in the unconstrained hidden tiles.
+    :param listOfSquares: List of all Square Objects in the current game
+    :param budget: SolverBudget to stop at, every state transition tried is a search node (default: None)
+    :param maxStates: Give up if more states than this are open at once (default: FRONTIER_DP_MAX_STATES)
+    :return: Dictionary with
+        'variables': frontier variables in the order they were assigned,
+        'totals': list of number of frontier solutions by number of mines in the frontier,
+        'configurations': number of consistent mine layouts of all hidden tiles,
+        'mineConfigurations': dictionary of variable to number of those layouts with a mine on it,
+        'interior': list of [i, j] indices of hidden tiles that aren't in any constraint,
+        'interiorMineConfigurations': number of layouts with a mine on any single interior tile,
+        or None if the budget or maxStates was exceeded
+    """
+    constraintList = getConstraints(listOfSquares)
+    variables = orderFrontierVariables(constraintList)
+    position = {variable: t for t, variable in enumerate(variables)}
+    n = len(variables)
+
+    nMines = 0
+    nFlagged = 0
+    interior = []
+    for sRows in listOfSquares:
+        for sq in sRows:
+            if sq.val == 9:
+                nMines += 1
+            if sq.flagAI:
+                nFlagged += 1
+            elif not sq.visible and not sq.safe and str(sq.i) + '_' + str(sq.j) not in position:
+                interior.append([sq.i, sq.j])
+    remainingMines = nMines - nFlagged
+    U = len(interior)
+
+    # Constraint c is open at boundary t (between variables t-1 and t) if first[c] < t <= last[c]
+    constraints = []
+    for c_Index, c_Value, c_Variables in constraintList:
+        positions = sorted(position[variable] for variable in c_Variables)
+        constraints.append((c_Value, positions))
+    containing = [[] for _ in range(n)]
+    for c, (c_Value, positions) in enumerate(constraints):
+        for t in positions:
+            containing[t].append(c)
+    opened = [[] for _ in range(n + 1)]
+    for c, (c_Value, positions) in enumerate(constraints):
+        for t in range(positions[0] + 1, positions[-1] + 1):
+            opened[t].append(c)
+
+    # For every variable, how to get the open partial sums after assigning it from the ones before it
+    plans = []
+    for t in range(n):
+        before = {c: index for index, c in enumerate(opened[t])}
+        closing = []
+        for c in containing[t]:
+            c_Value, positions = constraints[c]
+            if positions[-1] == t:
+                closing.append((before.get(c, -1), c_Value))
+        following = []
+        for c in opened[t + 1]:
+            c_Value, positions = constraints[c]
+            remaining = sum(1 for p in positions if p > t)
+            following.append((before.get(c, -1), t in positions, c_Value, remaining))
+        plans.append((closing, following))
+
+    def step(t, sums, x):
+        closing, following = plans[t]
+        for index, c_Value in closing:
+            if (sums[index] if index >= 0 else 0) + x != c_Value:
+                return None
+        newSums = []
+        for index, hasVariable, c_Value, remaining in following:
+            value = (sums[index] if index >= 0 else 0) + (x if hasVariable else 0)
+            if value > c_Value or value + remaining < c_Value:
+                return None
+            newSums.append(value)
+        return tuple(newSums)
+
+    def advance(t, table):
+        """
+        Forward step, budget is charged one search node per state transition tried
+        :param t: Index of the variable to assign
+        :param table: Dictionary of (open partial sums, mines so far) to number of ways to reach it at boundary t
+        :return: Same dictionary for boundary t + 1 or None if the budget was used up
+        """
+        if budget is not None and budget.spend(2 * len(table)):
+            return None
+        newTable = {}
+        for (sums, k), ways in table.items():
+            for x in (0, 1):
+                if k + x > remainingMines or k + x + (n - t - 1) + U < remainingMines:
+                    continue
+                newSums = step(t, sums, x)
+                if newSums is not None:
+                    key = (newSums, k + x)
+                    newTable[key] = newTable.get(key, 0) + ways
+        return newTable
+
+    # Forward pass keeping only every interval-th table as a checkpoint, the backward pass recomputes the tables
+    # in between a segment at a time, so about 2 * sqrt(n) tables are kept instead of n for a second forward pass
+    interval = max(1, math.isqrt(n))
+    checkpoints = {}
+    table = {((), 0): 1}
+    for t in range(n):
+        if t % interval == 0:
+            checkpoints[t] = table
+        table = advance(t, table)
+        if table is None or len(table) > maxStates:
+            return None
+
+    totals = [0] * (n + 1)
+    for (sums, k), ways in table.items():
+        totals[k] += ways
+
+    # Backward pass, backward maps states at boundary t + 1 to weighted number of ways to complete them
+    backward = {key: math.comb(U, remainingMines - key[1]) for key in table}
+    mineConfigurations = {}
+    for segmentStart in sorted(checkpoints, reverse=True):
+        segmentEnd = min(segmentStart + interval, n)
+        forwardTables = [checkpoints.pop(segmentStart)]
+        for t in range(segmentStart, segmentEnd - 1):
+            forwardTables.append(advance(t, forwardTables[-1]))
+            if forwardTables[-1] is None:
+                return None
+        for t in range(segmentEnd - 1, segmentStart - 1, -1):
+            if budget is not None and budget.spend(2 * len(forwardTables[t - segmentStart])):
+                return None
+            table = {}
+            mineWays = 0
+            for (sums, k), ways in forwardTables[t - segmentStart].items():
+                completions = 0
+                for x in (0, 1):
+                    newSums = step(t, sums, x)
+                    if newSums is None:
+                        continue
+                    following = backward.get((newSums, k + x), 0)
+                    completions += following
+                    if x == 1:
+                        mineWays += ways * following
+                table[(sums, k)] = completions
+            mineConfigurations[variables[t]] = mineWays
+            backward = table
+
+    configurations = sum(ways * math.comb(U, remainingMines - k) for k, ways in enumerate(totals) if k <= remainingMines)
+    interiorMineConfigurations = sum(ways * math.comb(U - 1, remainingMines - k - 1)
+                                     for k, ways in enumerate(totals) if U > 0 and remainingMines - k >= 1)
+    return {'variables': variables, 'totals': totals, 'configurations': configurations,
+            'mineConfigurations': mineConfigurations, 'interior': interior,
+            'interiorMineConfigurations': interiorMineConfigurations}
+
+
+def getMineConfigurations(frontierCount):
+    """
+    Helper function to map the exact layout counts made by countFrontierSolutions() to the tiles
+    :param frontierCount: Dictionary returned by countFrontierSolutions()
+    :return: Dictionary of [i, j] index tuple to number of consistent layouts with a mine on it,
+        for every hidden unknown tile
+    """
+    mineConfigurations = {}
+    for variable, mineWays in frontierCount['mineConfigurations'].items():
+        mineConfigurations[tuple(getVariableIndex(variable))] = mineWays
+    for index in frontierCount['interior']:
+        mineConfigurations[tuple(index)] = frontierCount['interiorMineConfigurations']
+    return mineConfigurations
+
+
+def getMineProbabilities(frontierCount):
+    """
+    Helper function to turn the counts made by countFrontierSolutions() into mine probabilities
+    :param frontierCount: Dictionary returned by countFrontierSolutions()
+    :return: Dictionary of [i, j] index tuple to probability of a mine for every hidden unknown tile,
+        empty if the game state has no consistent layout
+    """
+    configurations = frontierCount['configurations']
+    if configurations == 0:
+        return {}
+    return {index: mineWays / configurations for index, mineWays in getMineConfigurations(frontierCount).items()}
+
+
+def frontierCountingCSP(listOfSquares, budget=None, cascade=True):
+    """
+    Function to find safe and mine tiles by counting all consistent mine layouts with countFrontierSolutions().
+    A tile is safe if no layout has a mine on it and a mine if every layout has a mine on it.
+    Unlike the other tiers the number of remaining mines is always taken into account,
+    so this finds every tile that can be found with certainty.
+    Also, this function is ONLY called if cspSolver3D() fails to find any safe and/or mine tiles.
+    If counting is too big for maxStates or the budget, it calls globalCSP() instead.
+    :param listOfSquares: List of all Square Objects in the current game
+    :param budget: SolverBudget to stop at (default: None)
+    :param cascade: Whether to call globalCSP() if counting couldn't finish (default: True)
+    :return: True if finds new safe and/or mine tiles else False
+    """
+    print("\nTrying Frontier Counting.")
+    frontierCount = countFrontierSolutions(listOfSquares, budget)
+    if frontierCount is None:
+        print("Frontier is too big to count.")
+        if cascade:
+            return globalCSP(listOfSquares, budget)
+        return False
+    configurations = frontierCount['configurations']
+    if configurations == 0:
+        return False
+    foundConsistentSolution = False
+    # Exact counts, as the ratio of huge counts can round to 0 or 1 for tiles that aren't certain
+    for index, mineWays in getMineConfigurations(frontierCount).items():
+        if mineWays == 0 or mineWays == configurations:
+            foundConsistentSolution = True
+            print("Found consistent", index, "with value", int(mineWays == configurations))
+            if mineWays == 0:
+                listOfSquares[index[0]][index[1]].safe = True
+            else:
+                listOfSquares[index[0]][index[1]].flagAI = True
+    return foundConsistentSolution
+
+
+""" Monte Carlo sampling for guessing begins from here."""
+
+
+def buildSamplingProblem(listOfSquares):
+    """
+    Helper function to describe the current game state as plain lists that can be sent to sampling processes
+    :param listOfSquares: List of all Square Objects in the current game
+    :return: Dictionary with
+        'variables': frontier variables,
+        'constraints': list of (value, list of variable positions) for every constraint of getConstraints(),
+        'interior': list of [i, j] indices of hidden tiles that aren't in any constraint,
+        'remainingMines': number of mines not yet found by the AI
+    """
+    constraintList = getConstraints(listOfSquares)
+    variables = orderFrontierVariables(constraintList)
+    position = {variable: t for t, variable in enumerate(variables)}
+    nMines = 0
+    nFlagged = 0
+    interior = []
+    for sRows in listOfSquares:
+        for sq in sRows:
+            if sq.val == 9:
+                nMines += 1
+            if sq.flagAI:
+                nFlagged += 1
+            elif not sq.visible and not sq.safe and str(sq.i) + '_' + str(sq.j) not in position:
+                interior.append([sq.i, sq.j])
+    constraints = [(c_Value, [position[variable] for variable in c_Variables])
+                   for c_Index, c_Value, c_Variables in constraintList]
+    return {'variables': variables, 'constraints': constraints, 'interior': interior,
+            'remainingMines': nMines - nFlagged}
+
+
+def runSamplingChain(problem, seconds, seed=None, beta=SAMPLER_BETA):
+    """
+    Runs a single Markov chain over mine layouts of the frontier for a fixed time.
+    The chain samples p(x) proportional to C(U, M - k) * exp(-beta * E(x)) where x is the frontier layout with
+    'k' mines, 'U' interior tiles, 'M' remaining mines and E(x) the total amount by which the constraints are violated.
+    Restricted to layouts with E(x) = 0 this is the distribution of consistent layouts, while the violating layouts let
+    the chain move between consistent layouts far apart.
+    A big frontier is hardly ever consistent everywhere at once, so the tiles of every group of connected constraints
+    are counted whenever that group is consistent. The groups only depend on each other through the number of mines,
+    which makes this a close approximation when the interior is large.
+    Moves either flip a single tile or swap a mine with a safe tile of the frontier (keeping the number of mines).
+    :param problem: Dictionary made by buildSamplingProblem()
+    :param seconds: Time to run the chain for, the first SAMPLER_BURN_IN of which is not counted
+    :param seed: Seed of the chain's random number generator (default: None)
+    :param beta: Weight of a constraint violation (default: SAMPLER_BETA)
+    :return: Tuple of list of number of samples and list of number of samples with a mine for every frontier variable
+    """
+    rng = random.Random(seed)
+    n = len(problem['variables'])
+    U = len(problem['interior'])
+    M = problem['remainingMines']
+    values = [c_Value for c_Value, positions in problem['constraints']]
+    containing = [[] for _ in range(n)]
+    for c, (c_Value, positions) in enumerate(problem['constraints']):
+        for t in positions:
+            containing[t].append(c)
+
+    # Group the variables by connected constraints
+    group = [-1] * n
+    groupVariables = []
+    for first in range(n):
+        if group[first] == -1:
+            group[first] = len(groupVariables)
+            members = [first]
+            for t in members:
+                for c in containing[t]:
+                    for other in problem['constraints'][c][1]:
+                        if group[other] == -1:
+                            group[other] = group[first]
+                            members.append(other)
+            groupVariables.append(members)
+    constraintGroup = [group[positions[0]] for c_Value, positions in problem['constraints']]
+
+    # Start from a random layout with about the average mine density
+    density = M / (n + U) if n + U else 0
+    x = [1 if rng.random() < density else 0 for _ in range(n)]
+    # The interior has to fit the mines left over by the frontier, flips then keep it that way
+    while sum(x) > M:
+        x[x.index(1)] = 0
+    while M - sum(x) > U and 0 in x:
+        x[x.index(0)] = 1
+    sums = [sum(x[t] for t in positions) for c_Value, positions in problem['constraints']]
+    groupEnergy = [0] * len(groupVariables)
+    for c, c_Value in enumerate(values):
+        groupEnergy[constraintGroup[c]] += abs(sums[c] - c_Value)
+    mines = [t for t in range(n) if x[t]]
+    safes = [t for t in range(n) if not x[t]]
+    slot = [0] * n  # Position of every variable in mines or safes for constant time swaps
+    for index, t in enumerate(mines):
+        slot[t] = index
+    for index, t in enumerate(safes):
+        slot[t] = index
+
+    def flipDelta(t):
+        change = -1 if x[t] else 1
+        delta = 0
+        for c in containing[t]:
+            delta += abs(sums[c] + change - values[c]) - abs(sums[c] - values[c])
+        return delta
+
+    def flip(t):
+        change = -1 if x[t] else 1
+        for c in containing[t]:
+            groupEnergy[constraintGroup[c]] += abs(sums[c] + change - values[c]) - abs(sums[c] - values[c])
+            sums[c] += change
+        source, target = (mines, safes) if x[t] else (safes, mines)
+        last = source.pop()
+        if last != t:
+            source[slot[t]] = last
+            slot[last] = slot[t]
+        slot[t] = len(target)
+        target.append(t)
+        x[t] = 1 - x[t]
+
+    samples = [0] * n
+    mineCounts = [0] * n
+    thinning = max(1, n // 10)
+    startTime = time.monotonic()
+    burnInEnd = startTime + seconds * SAMPLER_BURN_IN
+    endTime = startTime + seconds
+    burnedIn = False
+    steps = 0
+    while n:
+        steps += 1
+        if steps % 256 == 0:
+            now = time.monotonic()
+            if now > endTime:
+                break
+            burnedIn = now > burnInEnd
+        k = len(mines)
+        # The move type doesn't depend on the layout, a move that can't be made leaves the layout as it is
+        if rng.random() < 0.5:
+            t = rng.randrange(n)
+            # Ratio of C(U, M - k') for the new number of mines k', 0 if the interior can't take M - k' mines
+            if x[t]:
+                ratio = (U - M + k) / (M - k + 1) if M - k + 1 <= U else 0
+            else:
+                ratio = (M - k) / (U - M + k + 1) if M - k - 1 >= 0 else 0
+            if ratio > 0 and rng.random() < ratio * math.exp(-beta * flipDelta(t)):
+                flip(t)
+        elif mines and safes:
+            a = mines[rng.randrange(len(mines))]
+            b = safes[rng.randrange(len(safes))]
+            delta = flipDelta(a)
+            flip(a)
+            delta += flipDelta(b)
+            flip(b)
+            if delta > 0 and rng.random() >= math.exp(-beta * delta):
+                flip(b)
+                flip(a)
+        if burnedIn and steps % thinning == 0:
+            for g, members in enumerate(groupVariables):
+                if groupEnergy[g] == 0:
+                    for t in members:
+                        samples[t] += 1
+                        mineCounts[t] += x[t]
+    return samples, mineCounts
+
+
+def estimateMineProbabilities(listOfSquares, seconds=SAMPLER_TIME_BUDGET, chains=SAMPLER_CHAINS, processes=None,
+                              seed=None):
+    """
+    Estimates the probability of a mine on every hidden unknown tile by running runSamplingChain() chains in parallel.
+    Used when the frontier is too big for countFrontierSolutions().
+    The confidence interval is 95% and comes from the spread of the estimates of the independent chains,
+    using the t distribution as there are only a few of them. So it only covers the Monte Carlo error, not the bias of
+    counting the groups of runSamplingChain() separately, which is largest when the groups compete for few mines.
+    The interior's probability is derived from the sum of the frontier's estimates, so its interval is widened by
+    their errors added up, as those can all point the same way. Frontier tiles without any samples are left out,
+    for the interior they count with the mean density of their constraints and an error spanning the whole range.
+    :param listOfSquares: List of all Square Objects in the current game
+    :param seconds: Time to spend on the chains (default: SAMPLER_TIME_BUDGET)
+    :param chains: Number of independent chains (default: SAMPLER_CHAINS)
+    :param processes: Number of processes running the chains, None for one per CPU, 1 to run them in this process
+        (default: None)
+    :param seed: Seed for the chains' random number generators (default: None)
+    :return: Dictionary of [i, j] index tuple to (probability, lower bound, upper bound) for every hidden unknown
+        tile that got any samples
+    """
+    problem = buildSamplingProblem(listOfSquares)
+    firstSeed = random.Random(seed).randrange(2 ** 32)
+    seeds = [firstSeed + chain for chain in range(chains)]
+    processes = min(chains, processes or os.cpu_count() or 1)
+    # Chains share the processes, so every chain gets its share of the time
+    chainSeconds = seconds * processes / chains
+    if processes == 1:
+        results = [runSamplingChain(problem, chainSeconds, chainSeed) for chainSeed in seeds]
+    else:
+        # Workers stop right away when the pool is terminated, even if their parent handles SIGTERM itself
+        with multiprocessing.Pool(processes, initializer=signal.signal,
+                                  initargs=(signal.SIGTERM, signal.SIG_DFL)) as workers:
+            results = workers.starmap(runSamplingChain, [(problem, chainSeconds, chainSeed) for chainSeed in seeds])
+
+    def spread(probability, chainEstimates, samples):
+        """
+        :param probability: Estimate from all samples
+        :param chainEstimates: Estimates of the single chains
+        :param samples: Number of samples
+        :return: Half the width of the confidence interval
+        """
+        if len(chainEstimates) > 1:
+            mean = sum(chainEstimates) / len(chainEstimates)
+            variance = sum((p - mean) ** 2 for p in chainEstimates) / (len(chainEstimates) - 1)
+            degrees = len(chainEstimates) - 1
+            quantile = T_QUANTILES_95[degrees - 1] if degrees <= len(T_QUANTILES_95) else 1.96
+            return quantile * math.sqrt(variance / len(chainEstimates))
+        return 1.96 * math.sqrt(probability * (1 - probability) / max(samples, 1))
+
+    estimates = {}
+    chainMines = [0.0] * chains  # Expected number of mines on the frontier according to every chain
+    frontierMines = 0.0  # Expected number of mines on the frontier and the sum of the errors of its tiles
+    frontierError = 0.0
+    for t, variable in enumerate(problem['variables']):
+        samples = sum(result[0][t] for result in results)
+        if samples == 0:
+            densities = [c_Value / len(positions) for c_Value, positions in problem['constraints'] if t in positions]
+            prior = sum(densities) / len(densities)
+            frontierMines += prior
+            frontierError += max(prior, 1 - prior)
+            chainMines = [mines + prior for mines in chainMines]
+            continue
+        probability = sum(result[1][t] for result in results) / samples
+        chainEstimates = [result[1][t] / result[0][t] for result in results if result[0][t]]
+        error = spread(probability, chainEstimates, samples)
+        estimates[tuple(getVariableIndex(variable))] = \
+            (probability, max(0.0, probability - error), min(1.0, probability + error))
+        frontierMines += probability
+        frontierError += error
+        for chain, result in enumerate(results):
+            chainMines[chain] += result[1][t] / result[0][t] if result[0][t] else probability
+    if problem['interior']:
+        # The interior tiles share the mines the frontier is expected to leave over
+        U = len(problem['interior'])
+        M = problem['remainingMines']
+        probability = min(1.0, max(0.0, (M - frontierMines) / U))
+        if problem['variables']:
+            chainEstimates = [(M - mines) / U for mines in chainMines]
+            error = max(spread(probability, chainEstimates, U), frontierError / U)
+        else:
+            error = 0.0  # Without a frontier every hidden tile is a mine with the same probability
+        interiorEstimate = (probability, max(0.0, probability - error), min(1.0, probability + error))
+        for index in problem['interior']:
+            estimates[tuple(index)] = interiorEstimate
+    return estimates
+
+
+def suggestGuess(listOfSquares, seconds=SAMPLER_TIME_BUDGET, processes=None):
+    """
+    Function to pick the hidden tile least likely to be a mine when no tile is certain.
+    Uses the exact probabilities of countFrontierSolutions() if the frontier can be counted in half the time,
+    otherwise the estimates of estimateMineProbabilities().
+    :param listOfSquares: List of all Square Objects in the current game
+    :param seconds: Time to spend (default: SAMPLER_TIME_BUDGET)
+    :param processes: Processes for estimateMineProbabilities() (default: None)
+    :return: Tuple ([i, j] index, probability of a mine) of the best guess or None if there is no hidden tile
+    """
+    frontierCount = countFrontierSolutions(listOfSquares, SolverBudget(seconds / 2))
+    if frontierCount is not None:
+        probabilities = getMineProbabilities(frontierCount)
+    else:
+        probabilities = {index: estimate[0] for index, estimate in
+                         estimateMineProbabilities(listOfSquares, seconds / 2, processes=processes).items()}
+    if not probabilities:
+        return None
+    index = min(probabilities, key=lambda tile: (probabilities[tile], tile))
+    return list(index), probabilities[index]
+
+
+""" Background solving for the helper AI begins from here."""
+
+
+def snapshotSquares(listOfSquares):
+    """
+    Creates an immutable snapshot of the game state that can be sent to another process
+    :param listOfSquares: List of all Square Objects in the current game
+    :return: Tuple of rows of (val, visible, flag, flagAI, safe) tuples
+    """
+    return tuple(tuple((sq.val, sq.visible, sq.flag, sq.flagAI, sq.safe) for sq in row) for row in listOfSquares)
+
+
+def squaresFromSnapshot(snapshot):
+    """
+    Creates a new List of Squares from a snapshot made by snapshotSquares()
+    :param snapshot: Snapshot of a game state
+    :return: New List of all Squares with the attributes of the snapshot
+    """
+    board = [[cell[0] for cell in row] for row in snapshot]
+    listOfSquares = updateListOfSquares(len(board), len(board[0]), board)
+    for row, snapshotRow in zip(listOfSquares, snapshot):
+        for square, cell in zip(row, snapshotRow):
+            square.val, square.visible, square.flag, square.flagAI, square.safe = cell
+    return listOfSquares
+
+
+def getDeductions(snapshot, listOfSquares):
+    """
+    Helper function to find the hints the helper AI changed since a snapshot was taken
+    :param snapshot: Snapshot of the game state before solving
+    :param listOfSquares: List of all Square Objects after solving
+    :return: List of (i, j, flag, flagAI, safe) tuples for every changed Square
+    """
+    deductions = []
+    for row, snapshotRow in zip(listOfSquares, snapshot):
+        for square, cell in zip(row, snapshotRow):
+            if (square.flag, square.flagAI, square.safe) != cell[2:]:
+                deductions.append((square.i, square.j, square.flag, square.flagAI, square.safe))
+    return deductions
+
+
+def applyDeductions(listOfSquares, deductions):
+    """
+    Applies the hints found by a SolverJob to the game
+    :param listOfSquares: List of all Square Objects in the current game
+    :param deductions: List of (i, j, flag, flagAI, safe) tuples made by getDeductions()
+    """
+    for i, j, flag, flagAI, safe in deductions:
+        square = listOfSquares[i][j]
+        square.flag, square.flagAI, square.safe = flag, flagAI, safe
+
+
+def solveInBackground(snapshot, resultQueue, seconds=None, nodes=None):
+    """
+    Worker process function running the same tiers as cspSolver() on a snapshot of the game.
+    After every tier a ('tier', tierName, foundNew, deductions) message is put in resultQueue
+    and a final ('done', foundConsistentSolution, completed, guess) message is put once solving has finished,
+    where guess is the suggestGuess() result if no tier found anything and None otherwise.
+    The guess gets what is left of the time budget, at most SAMPLER_TIME_BUDGET, and none if the budget is used up.
+    :param snapshot: Snapshot of the game state made by snapshotSquares()
+    :param resultQueue: multiprocessing.Queue to stream the results to
+    :param seconds: Time budget of the SolverBudget shared by the tiers (default: None)
+    :param nodes: Search node budget of the SolverBudget shared by the tiers (default: None)
+    """
+    # SolverJob.cancel() terminates this process, raising KeyboardInterrupt lets the sampler's pool stop its workers
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        solveSnapshot(snapshot, resultQueue, SolverBudget(seconds, nodes))
+    except KeyboardInterrupt:
+        pass
+
+
+def solveSnapshot(snapshot, resultQueue, budget):
+    """
+    Helper function running the tiers of solveInBackground()
+    :param snapshot: Snapshot of the game state made by snapshotSquares()
+    :param resultQueue: multiprocessing.Queue to stream the results to
+    :param budget: SolverBudget shared by the tiers and the guess
+    """
+    listOfSquares = squaresFromSnapshot(snapshot)
+
+    def runTier(tierName, tier):
+        before = snapshotSquares(listOfSquares)
+        foundNew = tier(listOfSquares)
+        resultQueue.put(('tier', tierName, foundNew, getDeductions(before, listOfSquares)))
+        return foundNew
+
+    print("Trying Straight-Forward Logic.")
+    foundConsistentSolution = runTier("Straight-Forward Logic", getAllFreeNeighbours)
+    foundConsistentSolution = runTier("Coupled Subsets CSP",
+                                      lambda squares: cspSolver2D(squares, budget)) or foundConsistentSolution
+    if not foundConsistentSolution:
+        foundConsistentSolution = runTier("3 subsets CSP",
+                                          lambda squares: cspSolver3D(squares, cascade=False, budget=budget))
+    if not foundConsistentSolution:
+        # Calls globalCSP() if the frontier is too big to count
+        foundConsistentSolution = runTier("Frontier Counting", lambda squares: frontierCountingCSP(squares, budget))
+    guess = None
+    secondsLeft = budget.secondsLeft()
+    if secondsLeft is None:
+        secondsLeft = SAMPLER_TIME_BUDGET
+    if not foundConsistentSolution and not budget.expired() and secondsLeft > 0:
+        guess = suggestGuess(listOfSquares, min(SAMPLER_TIME_BUDGET, secondsLeft))
+    resultQueue.put(('done', foundConsistentSolution, not budget.exhausted, guess))
+
+
+class SolverJob:
+    """
+    Class to run the helper AI in a worker process so that the game keeps rendering while it solves.
+    The job works on a snapshot of the game, so it is cancelled as soon as the player makes a move.
+    """
+
+    def __init__(self, listOfSquares, seconds=HELPER_TIME_BUDGET, nodes=None):
+        """
+        :param listOfSquares: List of all Square Objects in the current game
+        :param seconds: Time budget for solving (default: HELPER_TIME_BUDGET)
+        :param nodes: Search node budget for solving (default: None)
+        """
+        self.resultQueue = multiprocessing.Queue()
+        # Not daemonic, so that the sampler of the guess can run its chains in processes of its own
+        self.process = multiprocessing.Process(target=solveInBackground,
+                                               args=(snapshotSquares(listOfSquares), self.resultQueue, seconds, nodes))
+        self.cancelled = False
+        self.done = False
+
+    def start(self):
+        """Method to start solving"""
+        self.process.start()
+
+    def cancel(self):
+        """Method to stop solving and throw away all results that weren't polled yet"""
+        if not self.done and not self.cancelled:
+            self.cancelled = True
+            self.process.terminate()
+
+    def poll(self):
+        """
+        Method to get the results streamed by the worker process without blocking
+        :return: List of messages put by solveInBackground() since the last poll
+        """
+        messages = []
+        while not self.cancelled and not self.done:
+            isAlive = self.process.is_alive()
+            try:
+                message = self.resultQueue.get_nowait()
+            except queue.Empty:
+                if not isAlive:
+                    # The worker process died without finishing, e.g. it ran out of memory
+                    self.done = True
+                    messages.append(('done', False, False, None))
+                break
+            messages.append(message)
+            if message[0] == 'done':
+                self.done = True
+                self.process.join()
+        return messages
+
+
+""" No-guess board generation begins from here."""
+
+
+def getStartIndex(rows, cols):
+    """
+    Helper function to get the index from which no-guess boards are generated to be solvable
+    :param rows: Number of rows in the board
+    :param cols: Number of columns in the board
+    :return: [row, col] index of the center of the board
+    """
+    return [rows // 2, cols // 2]
+
+
+def isSolvableWithoutGuessing(board, start):
+    """
+    Plays the board headlessly using the helper AI i.e. cspSolver() and takeActions()
+    after exploring the start tile, until the game is won or the helper gets stuck.
+    Every cspSolver() call gets NO_GUESS_NODE_BUDGET search nodes so that a single board can't stall the generator,
+    a board that needs more is rejected.
+    The helper's output is suppressed as this is called many times while generating boards.
+    :param board: 2D array representing Minefield
+    :param start: [row, col] index of the first explored tile
+    :return: True if the helper AI can win the game without any guesses else False
+    """
+    rows, cols = len(board), len(board[0])
+    bombs = sum(row.count(9) for row in board)
+    listOfSquares = updateListOfSquares(rows, cols, board)
+    startSquare = listOfSquares[start[0]][start[1]]
+    if startSquare.val == 9:
+        return False
+    startSquare.visible = True
+    if startSquare.val == 0:
+        openGame(listOfSquares, startSquare)
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        while True:
+            countOfVisibleTiles = 0
+            for row in listOfSquares:
+                for square in row:
+                    if square.visible and square.val != 9:
+                        countOfVisibleTiles += 1
+            if countOfVisibleTiles == rows * cols - bombs:
+                return True
+            cspSolver(listOfSquares, SolverBudget(nodes=NO_GUESS_NODE_BUDGET))
+            if not takeActions(listOfSquares):
+                return False  # The helper is stuck, the player would have to guess here
+
+
+def generateNoGuessBoard(rows, cols, bombs, start=None, maxAttempts=None, rng=None):
+    """
+    Creates a 2D array for a mine field that can be won from the start tile without guessing.
+    Boards are generated like mine() with no mine on or around the start tile and
+    rejected until isSolvableWithoutGuessing() accepts one.
+    :param rows: Rows of array/Minefield
+    :param cols: Columns of array/Minefield
+    :param bombs: Number of bombs/mines to place
+    :param start: [row, col] index of the first explored tile (default: None i.e. getStartIndex())
+    :param maxAttempts: Maximum number of boards to try, tries forever if None (default: None)
+    :param rng: random.Random to place the bombs with (default: None)
+    :return: 2D array like mine() or None if no solvable board was found in maxAttempts
+    """
+    if start is None:
+        start = getStartIndex(rows, cols)
+    attempts = 0
+    while maxAttempts is None or attempts < maxAttempts:
+        attempts += 1
+        table = [[0] * cols for i in range(rows)]
+        safeIndices = getSurroundingIndices(table, start[0], start[1])
+        safeIndices.append(list(start))
+        table = changeTable(addBombs(table, bombs, safeIndices, rng))
+        if isSolvableWithoutGuessing(table, start):
+            return table
+    return None
+
+
+def countPoolBoards(directory):
+    """
+    Helper function to count the boards available in a pool directory
+    :param directory: Directory of a BoardPool
+    :return: Number of pre-generated boards in the directory
+    """
+    return sum(1 for name in os.listdir(directory) if name.endswith('.json'))
+
+
+def fillBoardPool(directory, rows, cols, bombs, size):
+    """
+    Worker process function that keeps a pool directory topped up with no-guess boards.
+    Every board is written to a temporary file first and then renamed so that
+    a board is never taken from the pool while it is still being written.
+    With several workers the pool may briefly hold up to size + workers - 1 boards.
+    :param directory: Directory of the BoardPool
+    :param rows: Rows of the boards
+    :param cols: Columns of the boards
+    :param bombs: Number of bombs in the boards
+    :param size: Number of boards to keep in the pool
+    """
+    rng = random.Random()  # Seeded from the OS, forked workers would share the parent's random state otherwise
+    start = getStartIndex(rows, cols)
+    while True:
+        if countPoolBoards(directory) >= size:
+            time.sleep(0.5)
+            continue
+        board = generateNoGuessBoard(rows, cols, bombs, start, rng=rng)
+        tempPath = os.path.join(directory, '.' + str(os.getpid()) + '.tmp')
+        with open(tempPath, 'w') as f:
+            json.dump({'board': board, 'start': start}, f)
+        os.replace(tempPath, os.path.join(directory, str(time.time_ns()) + '_' + str(os.getpid()) + '.json'))
+
+
+class BoardPool:
+    """
+    Bounded on-disk pool of pre-generated no-guess boards for a single difficulty.
+    Worker processes keep the pool topped up so that starting a no-guess game doesn't wait on generation.
+    Boards left in the pool when the game exits are reused the next time.
+    """
+
+    def __init__(self, rows, cols, bombs, size=NO_GUESS_POOL_SIZE, workers=None, directory=NO_GUESS_POOL_DIR):
+        """
+        :param rows: Rows of the boards
+        :param cols: Columns of the boards
+        :param bombs: Number of bombs in the boards
+        :param size: Number of boards to keep in the pool (default: NO_GUESS_POOL_SIZE)
+        :param workers: Number of worker processes (default: None i.e. one less than the CPU count)
+        :param directory: Parent directory of all pools (default: NO_GUESS_POOL_DIR)
+        """
+        self.rows = rows
+        self.cols = cols
+        self.bombs = bombs
+        self.size = size
+        self.workers = workers if workers is not None else max(1, (os.cpu_count() or 2) - 1)
+        self.directory = os.path.join(directory, str(rows) + 'x' + str(cols) + 'x' + str(bombs))
+        self.processes = []
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __len__(self):
+        return countPoolBoards(self.directory)
+
+    def start(self):
+        """Method to start the worker processes filling the pool"""
+        for _ in range(self.workers):
+            process = multiprocessing.Process(target=fillBoardPool, daemon=True,
+                                              args=(self.directory, self.rows, self.cols, self.bombs, self.size))
+            process.start()
+            self.processes.append(process)
+
+    def stop(self):
+        """Method to stop the worker processes"""
+        for process in self.processes:
+            process.terminate()
+        self.processes = []
+
+    def isRunning(self):
+        """
+        Method to check if any worker process is still filling the pool
+        :return: True if a worker process is alive else False
+        """
+        return any(process.is_alive() for process in self.processes)
+
+    def takeReady(self):
+        """
+        Method to take a board out of the pool without generating one
+        :return: Tuple of 2D array representing the Minefield and [row, col] index of its start tile
+            or None if the pool is empty
+        """
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            claimedPath = path + '.' + str(os.getpid()) + '.taken'
+            try:
+                os.rename(path, claimedPath)
+            except OSError:
+                continue  # Another process took this board first
+            with open(claimedPath) as f:
+                entry = json.load(f)
+            os.remove(claimedPath)
+            return entry['board'], entry['start']
+        return None
+
+    def take(self, maxAttempts=NO_GUESS_MAX_ATTEMPTS):
+        """
+        Method to take a board out of the pool.
+        Generates a board right away if the pool is empty.
+        :param maxAttempts: Maximum number of boards to try if the pool is empty (default: NO_GUESS_MAX_ATTEMPTS)
+        :return: Tuple of 2D array representing the Minefield and [row, col] index of its start tile
+            or None if the pool is empty and no board was found in maxAttempts
+        """
+        entry = self.takeReady()
+        if entry is not None:
+            return entry
+        start = getStartIndex(self.rows, self.cols)
+        board = generateNoGuessBoard(self.rows, self.cols, self.bombs, start, maxAttempts)
+        return (board, start) if board is not None else None
+
+
+def waitForPoolBoard(pool, screen, seconds=NO_GUESS_POOL_WAIT):
+    """
+    Function to wait for the worker processes of a BoardPool to generate a board, showing a message in the window.
+    If no board is ready within seconds or no worker is running, BoardPool.take() generates one right away.
+    :param pool: BoardPool to take a board from
+    :param screen: Pygame window to show the message in
+    :param seconds: Seconds to wait for the workers (default: NO_GUESS_POOL_WAIT)
+    :return: Tuple of 2D array representing the Minefield and [row, col] index of its start tile
+        or None if no board was found or the window was closed
+    """
+    message = Text((255, 255, 255), 10, 10, "Waiting for a no-guess board...")
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline and pool.isRunning():
+        entry = pool.takeReady()
+        if entry is not None:
+            return entry
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return None
+        message.draw(screen)
+        pygame.display.update()
+        time.sleep(NO_GUESS_POOL_POLL_INTERVAL)
+    message.text = "Generating a no-guess board..."
+    message.draw(screen)
+    pygame.display.update()
+    return pool.take()
+
+
+""" Headless game engine, recording and replay begins from here."""
+
+# Names of the helper AI actions understood by GameState.askHelper(), same as the buttons in game()
+HELPERS = ('AMN', 'AFN', 'CSP', 'AI')
+
+
+class GameState:
+    """
+    Class holding the state and rules of a single game without any UI.
+    Used by game() for the pygame window and by replayLog() to re-execute recorded games headlessly.
+    """
+
+    def __init__(self, rows, cols, bombs, seed=None, board=None, start=None):
+        """
+        :param rows: Number of Rows for the game
+        :param cols: Number of Columns for the game
+        :param bombs: Number of Bombs in the game
+        :param seed: Seed of the game's random number generator, a random seed is chosen if None (default: None)
+        :param board: 2D array representing the Minefield to play instead of generating one (default: None)
+        :param start: [row, col] index of a tile to explore right away e.g. of a no-guess board (default: None)
+        """
+        self.rows = rows
+        self.cols = cols
+        self.bombs = bombs
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.initialBoard = board
+        self.start = start
+        self.board = Board(board if board is not None else mine(rows, cols, bombs, self.rng))
+        self.listOfSquares = updateListOfSquares(rows, cols, self.board.board)
+        self.hasNotClickedTile = True  # Boolean to check if a tile exploration is user's first click
+        self.status = 'playing'  # 'playing', 'won' or 'lost'
+        if start is not None:
+            # Boards given with a start tile are only guaranteed solvable from there, so it is explored first
+            self.hasNotClickedTile = False
+            self.reveal(start[0], start[1])
+
+    def reveal(self, i, j):
+        """
+        Method to explore a tile like a left click on it.
+        The first explored tile and its surrounding never contain a mine, such mines are moved elsewhere.
+        :param i: Row index of the tile
+        :param j: Column index of the tile
+        :return: True if the tile was explored else False (game over, already visible or flagged)
+        """
+        square = self.listOfSquares[i][j]
+        if self.status != 'playing' or square.flag or square.visible or square.flagAI:
+            return False
+        if self.hasNotClickedTile:
+            # This is what ensures the first clicked tile and its surrounding is never a mine
+            self.hasNotClickedTile = False
+            if square.val != 0:
+                c = self.board
+                safeIndices = getSurroundingIndices(c.board, i, j)
+                safeIndices.append([i, j])
+                # Number of mines around the first clicked tile which is to be moved elsewhere
+                noOfBombs = getHowManyAndWhereAround(self.listOfSquares, i, j, ['val'], [9])[0]
+                if square.val == 9:
+                    # If the users' first click was a mine, it should also be moved elsewhere
+                    noOfBombs += 1
+                    c.board[i][j] = 0
+                c.board = addBombs(c.board, noOfBombs, safeIndices, self.rng)
+                for index in getHowManyAndWhereAround(self.listOfSquares, i, j, ['val'], [9])[1]:
+                    # Diffuse all mines around the first clicked tile
+                    c.board[index[0]][index[1]] = 0
+                c.board = resetHintsValue(c.board)
+                self.listOfSquares = updateListOfSquares(self.rows, self.cols, c.board)
+                square = self.listOfSquares[i][j]
+            print("I changed the board for you. Your new board is:")
+            print(self.board)
+
+        square.visible = True
+        if square.val == 9:
+            print("Game Over")
+            self.status = 'lost'
+            return True
+        if square.val == 0:
+            openGame(self.listOfSquares, square)
+        self.updateStatus()
+        return True
+
+    def toggleFlag(self, i, j):
+        """
+        Method to flag or un-flag a tile like a right click on it
+        :param i: Row index of the tile
+        :param j: Column index of the tile
+        :return: True if the flag was toggled else False (game over or tile already visible)
+        """
+        square = self.listOfSquares[i][j]
+        if self.status != 'playing' or square.visible:
+            return False
+        square.flag = not square.flag
+        return True
+
+    def askHelper(self, helper, budget=None):
+        """
+        Method to use the helper AI like pressing one of its buttons
+        :param helper: One of HELPERS i.e. 'AMN', 'AFN', 'CSP' or 'AI' (Take AI actions)
+        :param budget: SolverBudget for 'CSP' (default: None)
+        :return: True if the helper found new tiles or took actions else False
+        """
+        if self.status != 'playing':
+            return False
+        if helper == 'AMN':
+            return getAllMineNeighbours(self.listOfSquares)
+        elif helper == 'AFN':
+            return getAllFreeNeighbours(self.listOfSquares)
+        elif helper == 'CSP':
+            return cspSolver(self.listOfSquares, budget)
+        elif helper == 'AI':
+            tookActions = takeActions(self.listOfSquares)
+            self.updateStatus()
+            return tookActions
+        raise ValueError("Unknown helper: " + str(helper))
+
+    def updateStatus(self):
+        """Method to check if the game is WON"""
+        countOfVisibleTiles = 0
+        for row in self.listOfSquares:
+            for square in row:
+                if square.visible and square.val != 9:
+                    countOfVisibleTiles += 1
+        if countOfVisibleTiles == self.rows * self.cols - self.bombs:
+            print("You Won")
+            self.status = 'won'
+
+
+class GameRecorder:
+    """
+    Class to record the events of games to a log file that can be replayed by replayLog().
+    Every game starts with a JSON object line with its settings, followed by one compact JSON array line per event:
+        [milliseconds since the game started, 'r' (reveal) or 'f' (flag), row, col] or
+        [milliseconds since the game started, 'h' (helper), helper name] or
+        [milliseconds since the game started, 'd' (deductions), list of [i, j, flag, flagAI, safe]]
+    The background solver's hints are recorded as 'd' events when the game applies them, so a replay doesn't
+    depend on how fast the solver was or on solves the player cancelled.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path of the log file, new games are appended to it
+        """
+        self.file = open(path, 'a', buffering=1)  # Line buffered so that a crash doesn't lose the log
+        self.startTime = time.monotonic()
+
+    def startGame(self, state):
+        """
+        Method to record the start of a new game
+        :param state: GameState of the new game
+        """
+        header = {'rows': state.rows, 'cols': state.cols, 'bombs': state.bombs, 'seed': state.seed}
+        if state.initialBoard is not None:
+            header['board'] = state.initialBoard
+            header['start'] = state.start
+        self.file.write(json.dumps(header, separators=(',', ':')) + '\n')
+        self.startTime = time.monotonic()
+
+    def record(self, kind, *args):
+        """
+        Method to record an event of the current game
+        :param kind: 'r' for reveal, 'f' for flag, 'h' for helper or 'd' for deductions
+        :param args: Row and column of the tile, the helper name or the deductions made by getDeductions()
+        """
+        milliseconds = int((time.monotonic() - self.startTime) * 1000)
+        self.file.write(json.dumps([milliseconds, kind] + list(args), separators=(',', ':')) + '\n')
+
+    def close(self):
+        """Method to close the log file"""
+        self.file.close()
+
+
+def readLog(path):
+    """
+    Generator function to read the games recorded by a GameRecorder
+    :param path: Path of the log file
+    :return: Yields a (header, events) tuple for every recorded game
+    """
+    header = None
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict):
+                if header is not None:
+                    yield header, events
+                header = entry
+                events = []
+            else:
+                events.append(entry)
+    if header is not None:
+        yield header, events
+
+
+def replayGame(header, events):
+    """
+    Re-executes a recorded game against GameState as fast as possible.
+    Solve using CSP presses aren't solved again, the hints the game applied from the solver are replayed from the
+    'd' events instead, so the replay doesn't depend on the speed of the machine.
+    :param header: Settings of the game as read by readLog()
+    :param events: Events of the game as read by readLog()
+    :return: Dictionary with the final status of the game, number of events and seconds taken
+    """
+    startTime = time.perf_counter()
+    state = GameState(header['rows'], header['cols'], header['bombs'], header['seed'],
+                      header.get('board'), header.get('start'))
+    for event in events:
+        kind = event[1]
+        if kind == 'r':
+            state.reveal(event[2], event[3])
+        elif kind == 'f':
+            state.toggleFlag(event[2], event[3])
+        elif kind == 'h' and event[2] != 'CSP':
+            state.askHelper(event[2])
+        elif kind == 'd':
+            applyDeductions(state.listOfSquares, event[2])
+    return {'status': state.status, 'events': len(events), 'seconds': time.perf_counter() - startTime}
+
+
+def replayLog(path):
+    """
+    Replays every game of a log file headlessly i.e. without opening a pygame window.
+    Output of the game and helper AI is suppressed.
+    :param path: Path of the log file
+    :return: List of the results of replayGame() for every game in the log
+    """
+    results = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for header, events in readLog(path):
+            results.append(replayGame(header, events))
+    return results
+
+
+""" Performance instrumentation begins from here."""
+
+
+class PerfMonitor:
+    """
+    Class measuring where the time of every frame of game() goes, to find out why the UI is slow on big boards.
+    A frame is split into the phases of PERF_PHASES, and event queue lag, click to reveal latency and helper durations
+    are measured.
+    Averages of the last PERF_WINDOW frames are shown in a HUD toggled with F3, and every frame can be written
+    to a CSV file (if the path ends with .csv) or a JSON lines file.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: Path of the file to write every frame to, nothing is written if None (default: None)
+        """
+        self.file = open(path, 'w') if path is not None else None
+        self.csv = path is not None and path.lower().endswith('.csv')
+        if self.csv:
+            self.file.write(','.join(PERF_LOG_COLUMNS) + '\n')
+        self.visible = False
+        self.font = None  # Created when first drawn, as pygame has to be initialized
+        self.startTime = time.perf_counter()
+        self.frame = 0
+        self.frameStart = self.startTime
+        self.lastMark = self.startTime
+        self.phases = dict.fromkeys(PERF_PHASES, 0.0)
+        self.recentFrames = deque(maxlen=PERF_WINDOW)  # (frame time, phases) of the last frames
+        self.lastPoll = self.startTime  # Times the event queue was last emptied and emptied before that
+        self.previousPoll = self.startTime
+        self.queueLag = None  # Longest time the events of the last frame with any events may have waited
+        self.clickStart = None  # Time the event that explored a tile was in the queue by
+        self.clickLatency = None
+        self.runningHelpers = {}  # Name to start time of the helper requests that are still running
+        self.lastHelper = None  # (name, seconds) of the last finished helper request
+        self.frameEvents = {}  # Click latency and helper duration finished this frame, for the log
+
+    def startFrame(self):
+        """Method to call at the start of every frame"""
+        self.frameStart = self.lastMark = time.perf_counter()
+        self.phases = dict.fromkeys(PERF_PHASES, 0.0)
+        self.frameEvents = {}
+
+    def mark(self, phase):
+        """
+        Method to add the time since the last mark (or the start of the frame) to a phase of the frame
+        :param phase: One of PERF_PHASES
+        """
+        now = time.perf_counter()
+        self.phases[phase] += now - self.lastMark
+        self.lastMark = now
+
+    def eventsPolled(self, events):
+        """
+        Method to call right after the event queue was emptied. As pygame events carry no time they arrived at,
+        the queue lag is the time since the queue was emptied before, the longest any of them may have waited.
+        :param events: List of the events taken from the queue
+        """
+        now = time.perf_counter()
+        if events:
+            self.queueLag = now - self.lastPoll
+            self.frameEvents['lagMs'] = round(self.queueLag * 1000, 3)
+        self.previousPoll = self.lastPoll
+        self.lastPoll = now
+
+    def tileExplored(self):
+        """
+        Method to call when a click explored a tile, the latency is measured from the time the click was in the
+        event queue by, i.e. the poll before the one that took it, up to the display update showing the tile
+        """
+        if self.clickStart is None:
+            self.clickStart = self.previousPoll
+
+    def helperStarted(self, name):
+        """
+        Method to call when a helper request starts
+        :param name: Name of the helper
+        """
+        self.runningHelpers[name] = time.perf_counter()
+
+    def helperFinished(self, name, cancelled=False):
+        """
+        Method to call when a helper request is finished, does nothing if it isn't running.
+        If more than one finishes in a frame, the log has the last one.
+        :param name: Name of the helper
+        :param cancelled: Whether the request was cancelled before it finished (default: False)
+        """
+        if name not in self.runningHelpers:
+            return
+        seconds = time.perf_counter() - self.runningHelpers.pop(name)
+        self.lastHelper = name + (" (cancelled)" if cancelled else ""), seconds
+        self.frameEvents['helper'] = self.lastHelper[0]
+        self.frameEvents['helperMs'] = round(seconds * 1000, 3)
+
+    def endFrame(self):
+        """Method to call at the end of every frame after the display update"""
+        now = time.perf_counter()
+        frameTime = now - self.frameStart
+        self.recentFrames.append((frameTime, self.phases))
+        if self.clickStart is not None:
+            self.clickLatency = now - self.clickStart
+            self.frameEvents['clickMs'] = round(self.clickLatency * 1000, 3)
+            self.clickStart = None
+        if self.file is not None:
+            row = {'frame': self.frame, 'time': round(self.frameStart - self.startTime, 6),
+                   'frameMs': round(frameTime * 1000, 3)}
+            for phase, seconds in self.phases.items():
+                row[phase + 'Ms'] = round(seconds * 1000, 3)
+            row.update(self.frameEvents)
+            if self.csv:
+                self.file.write(','.join(str(row.get(column, '')) for column in PERF_LOG_COLUMNS) + '\n')
+            else:
+                self.file.write(json.dumps(row, separators=(',', ':')) + '\n')
+        self.frame += 1
+
+    def draw(self, win):
+        """
+        Method to draw the HUD with the averages of the recent frames in the top left corner, if it is visible
+        :param win: Pygame window on which to draw the HUD
+        """
+        if not self.visible or not self.recentFrames:
+            return
+        if self.font is None:
+            self.font = pygame.font.SysFont('consolas', 14)
+        totalTime = sum(frameTime for frameTime, phases in self.recentFrames)
+        frames = len(self.recentFrames)
+        phaseTimes = [phase + " " + str(round(sum(phases[phase] for frameTime, phases in self.recentFrames) /
+                                              frames * 1000, 2)) for phase in PERF_PHASES]
+        lines = ["FPS " + str(round(frames / totalTime)) + "  frame " + str(round(totalTime / frames * 1000, 2)) +
+                 " ms" if totalTime > 0 else "FPS -",
+                 "  ".join(phaseTimes[:2]) + " ms",
+                 "  ".join(phaseTimes[2:]) + " ms",
+                 "event lag " + (str(round(self.queueLag * 1000, 1)) + " ms" if self.queueLag is not None else "-"),
+                 "click to reveal " + (str(round(self.clickLatency * 1000, 1)) + " ms"
+                                       if self.clickLatency is not None else "-"),
+                 "helper " + (self.lastHelper[0] + " " + str(round(self.lastHelper[1] * 1000)) + " ms"
+                              if self.lastHelper is not None else "-")]
+        for name, start in self.runningHelpers.items():
+            lines.append(name + " running " + str(round((time.perf_counter() - start) * 1000)) + " ms")
+        for line, text in enumerate(lines):
+            win.blit(self.font.render(text, True, (255, 255, 0), (0, 0, 0)), (4, 4 + 16 * line))
+
+    def close(self):
+        """Method to close the log file"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def game(rows, cols, bombs, pool=None, seed=None, recorder=None, perf=None):
     """
     Main Function for the game logic and initializations
     :param rows: Number of Rows for the game
     :param cols: Number of Columns for the game
     :param bombs: Number of Bombs in the game
+    :param pool: BoardPool to take a no-guess board from, boards are generated by mine() if None (default: None)
+    :param seed: Seed for generating the board, a random seed is chosen if None (default: None)
+    :param recorder: GameRecorder to record the game's events with (default: None)
+    :param perf: PerfMonitor to measure the frames with, one without a log file is used if None (default: None)
     """
+    pygame.init()
+    if perf is None:
+        perf = PerfMonitor()  # The HUD can still be shown with F3
     noOfFlags = 0  # Variable to count how many flags the user has placed
 
     """Initialize/Load all the images"""
@@ -710,12 +2299,28 @@ def game(rows, cols, bombs):
     # Array of images to show correct image based on the Square.val
     numbers = [zero, one, two, three, four, five, six, seven, eight, nine]
 
-    c = Board(mine(rows, cols, bombs))
-    W = len(c.board[0]) * IMG_SIZE  # Width occupied by game Squares
-    H = len(c.board) * IMG_SIZE  # Height occupied by game Squares
-    print(c)
+    W = cols * IMG_SIZE  # Width occupied by game Squares
+    H = rows * IMG_SIZE  # Height occupied by game Squares
     screen = pygame.display.set_mode((W + 250, H + 120))
 
+    noGuessBoard = None
+    if pool is not None:
+        noGuessBoard = waitForPoolBoard(pool, screen)
+        if not pygame.display.get_init():
+            return  # The window was closed while waiting
+        screen.fill((0, 0, 0))  # Clears the waiting message
+        if noGuessBoard is None:
+            print("Couldn't find a no-guess board, this board may need guessing.")
+    if noGuessBoard is not None:
+        state = GameState(rows, cols, bombs, seed, noGuessBoard[0], noGuessBoard[1])
+    else:
+        state = GameState(rows, cols, bombs, seed)
+    if recorder is not None:
+        recorder.startGame(state)
+    c = state.board
+    print("Seed of this game:", state.seed)
+    print(c)
+
     """Initializing the UI objects"""
     AMN_Button = Button((0, 0, 200), W + 25, 10, 200,
                         60, "Show All MINE Neighbours")
@@ -730,33 +2335,50 @@ def game(rows, cols, bombs):
     AI_Text = Text((255, 255, 255), 10, H + 45, "")
     EndGame_Text = Text((255, 255, 255), 10, H + 85, "")
     Tooltip_Pos = (W, 290)
+    if pool is not None and noGuessBoard is None:
+        AI_Text.text = "AI: Couldn't find a no-guess board, this one may need guessing."
+        AI_Text.draw(screen)
 
-    listOfSquares = updateListOfSquares(rows, cols, c.board)
+    solverJob = None  # SolverJob of the CSP_Button press that is currently solving, if any
     run = True
-    hasNotClickedTile = True  # Boolean to check if a tile exploration is user's first click
     while run:
+        perf.startFrame()
         noOfFlags = 0
         AMN_Button.draw(screen, (255, 255, 255))
         AFN_Button.draw(screen, (255, 255, 255))
         CSP_Button.draw(screen, (255, 255, 255))
         AIMove_Button.draw(screen, (255, 255, 255))
         Mines_Text.draw(screen)
+        perf.mark('text')
 
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        perf.eventsPolled(events)
+        for event in events:
             mousePos = pygame.mouse.get_pos()
             if event.type == pygame.QUIT:
                 run = False
+                if solverJob is not None:
+                    solverJob.cancel()
                 pygame.quit()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
                     run = False
-                    restart(rows, cols, bombs)
+                    if solverJob is not None:
+                        solverJob.cancel()
+                    restart(rows, cols, bombs, pool, recorder, perf)
+                elif event.key == pygame.K_F3:
+                    perf.visible = not perf.visible
             # Left Click Event
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 """Call necessary function on each button press"""
                 if AMN_Button.isOver(mousePos):
                     print("I'll now show you all MINE neighbours.")
-                    if getAllMineNeighbours(listOfSquares):
+                    if recorder is not None:
+                        recorder.record('h', 'AMN')
+                    perf.helperStarted('AMN')
+                    found = state.askHelper('AMN')
+                    perf.helperFinished('AMN')
+                    if found:
                         AI_Text.text = "AI: I found some Mine neighbours"
                     else:
                         AI_Text.text = "AI: Couldn't find any mine neighbours. Try CSP or open more tiles."
@@ -765,7 +2387,12 @@ def game(rows, cols, bombs):
 
                 if AFN_Button.isOver(mousePos):
                     print("I'll now show you all FREE neighbours.")
-                    if getAllFreeNeighbours(listOfSquares):
+                    if recorder is not None:
+                        recorder.record('h', 'AFN')
+                    perf.helperStarted('AFN')
+                    found = state.askHelper('AFN')
+                    perf.helperFinished('AFN')
+                    if found:
                         AI_Text.text = "AI: I found some Free neighbours"
                     else:
                         AI_Text.text = "AI: Couldn't find any safe neighbours. Try CSP or open more tiles."
@@ -774,16 +2401,28 @@ def game(rows, cols, bombs):
 
                 if CSP_Button.isOver(mousePos):
                     print("I'll now show you all solutions I found using CSP.")
-                    if cspSolver(listOfSquares):
-                        AI_Text.text = "AI: Hey, Look I found some certain safe and mine tiles using Facts and Logic."
-                    else:
-                        AI_Text.text = "AI: This is so Sad. I couldn't find any consistent solution."
+                    if recorder is not None:
+                        recorder.record('h', 'CSP')
+                    if solverJob is not None:
+                        solverJob.cancel()
+                        perf.helperFinished('CSP', cancelled=True)
+                    solverJob = SolverJob(state.listOfSquares)
+                    solverJob.start()
+                    perf.helperStarted('CSP')
+                    AI_Text.text = "AI: Let me think..."
                     CheatToClearAIText.draw(screen)
                     AI_Text.draw(screen)
 
                 if AIMove_Button.isOver(mousePos):
                     print("I'll now show you all solutions I found using CSP.")
-                    if takeActions(listOfSquares):
+                    if solverJob is not None:
+                        solverJob.cancel()  # The solver's snapshot is outdated once tiles are opened
+                    if recorder is not None:
+                        recorder.record('h', 'AI')
+                    perf.helperStarted('AI')
+                    found = state.askHelper('AI')
+                    perf.helperFinished('AI')
+                    if found:
                         AI_Text.text = "AI: I flagged the found mines and opened found safe tiles."
                     else:
                         AI_Text.text = "AI: No mines to flag or tiles to open. Try solving first."
@@ -791,65 +2430,29 @@ def game(rows, cols, bombs):
                     AI_Text.draw(screen)
 
                 """Perform necessary Actions based on the tile/Square clicked"""
-                for i in listOfSquares:
-                    for j in i:
-                        r = pygame.rect.Rect(mousePos, (1, 1))
-                        if j.rect.colliderect(r):
-                            if j.flag == False and j.visible == False and j.flagAI == False:
-                                if hasNotClickedTile:
-                                    # This is what ensures the first clicked tile and its surrounding is never a mine
-                                    hasNotClickedTile = False
-                                    if j.val != 0:
-                                        safeIndices = getSurroundingIndices(
-                                            c.board, j.i, j.j)
-                                        safeIndices.append([j.i, j.j])
-                                        # print(safeIndices)
-                                        # Number of mines around the first clicked tile which is to be moved elsewhere
-                                        noOfBombs = getHowManyAndWhereAround(
-                                            listOfSquares, j.i, j.j, ['val'], [9])[0]
-                                        # print("i:", j.i, "j:", j.j)
-                                        if j.val == 9:
-                                            # If the users' first click was a mine, it should also be moved elsewhere
-                                            noOfBombs += 1
-                                            c.board[j.i][j.j] = 0
-                                        j.val = 0
-                                        c.board = addBombs(
-                                            c.board, noOfBombs, safeIndices)
-                                        for index in getHowManyAndWhereAround(listOfSquares, j.i, j.j, ['val'], [9])[1]:
-                                            # Diffuse all mines around the first clicked tile
-                                            c.board[index[0]][index[1]] = 0
-                                        c.board = resetHintsValue(c.board)
-                                        listOfSquares = updateListOfSquares(
-                                            rows, cols, c.board)
-                                        print(c)
-                                        listOfSquares[j.i][j.j].visible = True
-                                        openGame(listOfSquares, j)
-                                    print(
-                                        "I changed the board for you. Your new board is:")
-                                    print(c)
-
-                                if j.val == 9:
-                                    AI_Text.text = "AI: You clicked a mine. Now start a new game by pressing 'r'."
-                                    EndGame_Text.text = "GAME OVER :("
-                                    CheatToClearAIText.draw(screen)
-                                    AI_Text.draw(screen)
-                                    EndGame_Text.draw(screen)
-                                    print("Game Over")
-                                    run = False
-                                j.visible = True
-                                if j.val == 0:
-                                    openGame(listOfSquares, j)
-                                    j.visible = True
-                                # printTable(currentPlayState(listOfSquares, bombs))
+                i, j = mousePos[1] // IMG_SIZE, mousePos[0] // IMG_SIZE
+                if i < rows and j < cols and state.reveal(i, j):
+                    perf.tileExplored()
+                    if solverJob is not None:
+                        solverJob.cancel()  # The solver's snapshot is outdated once tiles are opened
+                    if recorder is not None:
+                        recorder.record('r', i, j)
+                    if state.status == 'lost':
+                        AI_Text.text = "AI: You clicked a mine. Now start a new game by pressing 'r'."
+                        EndGame_Text.text = "GAME OVER :("
+                        CheatToClearAIText.draw(screen)
+                        AI_Text.draw(screen)
+                        EndGame_Text.draw(screen)
+                        run = False
 
             # Right Click Event: To flag tiles as mines
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
-                for i in listOfSquares:
-                    for j in i:
-                        r = pygame.rect.Rect(mousePos, (1, 1))
-                        if j.rect.colliderect(r):
-                            if not j.visible:
-                                j.flag = not j.flag
+                i, j = mousePos[1] // IMG_SIZE, mousePos[0] // IMG_SIZE
+                if i < rows and j < cols and state.toggleFlag(i, j):
+                    if solverJob is not None:
+                        solverJob.cancel()
+                    if recorder is not None:
+                        recorder.record('f', i, j)
 
             # Mouse motion event, Change button color and show tooltip
             elif event.type == pygame.MOUSEMOTION:
@@ -875,8 +2478,35 @@ def game(rows, cols, bombs):
                 else:
                     AIMove_Button.color = (0, 0, 200)
 
+        """Show the hints streamed by the solver so far"""
+        if solverJob is not None:
+            for message in solverJob.poll():
+                if message[0] == 'tier':
+                    tierName, foundNew, deductions = message[1:]
+                    applyDeductions(state.listOfSquares, deductions)
+                    if recorder is not None and deductions:
+                        recorder.record('d', deductions)
+                    if foundNew:
+                        AI_Text.text = "AI: " + tierName + " found some tiles. Still thinking..."
+                elif message[1]:
+                    AI_Text.text = "AI: Hey, Look I found some certain safe and mine tiles using Facts and Logic."
+                elif message[3] is not None:
+                    (guessRow, guessCol), probability = message[3]
+                    AI_Text.text = "AI: Nothing is certain. Best guess: row " + str(guessRow + 1) + ", column " + \
+                                   str(guessCol + 1) + " (" + str(round(probability * 100)) + "% chance of a mine)."
+                elif not message[2]:
+                    AI_Text.text = "AI: I ran out of time before finding any certain tiles. Try again or guess."
+                else:
+                    AI_Text.text = "AI: This is so Sad. I couldn't find any consistent solution."
+                CheatToClearAIText.draw(screen)
+                AI_Text.draw(screen)
+            if solverJob.done or solverJob.cancelled:
+                perf.helperFinished('CSP', cancelled=solverJob.cancelled)
+                solverJob = None
+        perf.mark('events')
+
         """Display correct image for the Square based on its attributes"""
-        for i in listOfSquares:
+        for i in state.listOfSquares:
             for j in i:
                 if j.visible:
                     screen.blit(numbers[j.val], (j.x, j.y))
@@ -889,26 +2519,27 @@ def game(rows, cols, bombs):
                     screen.blit(flagAI, (j.x, j.y))
                 if j.safe and not j.visible:
                     screen.blit(safe, (j.x, j.y))
+        perf.mark('tiles')
         Flags_Text.text = "Flags: " + str(noOfFlags)
         Flags_Text.draw(screen)
 
-        countOfVisibleTiles = 0  # To check if the game is WON
-        for i in listOfSquares:
-            for j in i:
-                if j.visible and j.val != 9:
-                    countOfVisibleTiles += 1
-            if countOfVisibleTiles == rows * cols - bombs:
-                run = False
-                AI_Text.text = "AI: Congratulations. You can press 'r' to start a new game"
-                CheatToClearAIText.draw(screen)
-                AI_Text.draw(screen)
-                EndGame_Text.text = "You Won :)"
-                EndGame_Text.draw(screen)
-                print("You Won")
+        if state.status == 'won':
+            run = False
+            AI_Text.text = "AI: Congratulations. You can press 'r' to start a new game"
+            CheatToClearAIText.draw(screen)
+            AI_Text.draw(screen)
+            EndGame_Text.text = "You Won :)"
+            EndGame_Text.draw(screen)
+        perf.draw(screen)
+        perf.mark('text')
 
         pygame.display.update()
+        perf.mark('display')
+        perf.endFrame()
 
-    for i in listOfSquares:
+    if solverJob is not None:
+        solverJob.cancel()
+    for i in state.listOfSquares:
         for j in i:
             if j.val == 9:
                 screen.blit(nine, (j.x, j.y))
@@ -917,41 +2548,79 @@ def game(rows, cols, bombs):
 
     run = True
     while run:
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        perf.eventsPolled(events)  # So that the next game's first frame doesn't count the time spent here as lag
+        for event in events:
             if event.type == pygame.QUIT:
                 run = False
                 pygame.quit()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
                     run = False
-                    restart(rows, cols, bombs)
+                    restart(rows, cols, bombs, pool, recorder, perf)
 
 
 if __name__ == '__main__':
-    print("This is a Minesweeper game with Helper AI.\nWhen prompted please choose your desired difficulty.")
-    print("EASY:\t8x10 grid with 10 mines")
-    print("MEDIUM:\t14x18 grid with 40 mines")
-    print("HARD:\t20x24 grid with 99 mines")
-    takingInput = True
-    while takingInput:
-        difficulty = input(
-            "Enter 'E' for Easy, 'M' for Medium, 'H' for Hard and 'C' for custom: ")
-        if difficulty in ['E', 'e']:
-            takingInput = False
-            game(EASY_ROWS, EASY_COLS, EASY_MINES)
-        elif difficulty in ['M', 'm']:
-            takingInput = False
-            game(MEDIUM_ROWS, MEDIUM_COLS, MEDIUM_MINES)
-        elif difficulty in ['H', 'h']:
-            takingInput = False
-            game(HARD_ROWS, HARD_COLS, HARD_MINES)
-        elif difficulty in ['C', 'c']:
-            rows = int(input("Enter Number of rows: "))
-            cols = int(input("Enter number of columns: "))
-            mines = int(input(
-                "Enter number of mines to place (Should be less than 25% of the board size): "))
-            if mines < (rows * cols) / 4:
+    parser = argparse.ArgumentParser(description="Minesweeper game with Helper AI")
+    parser.add_argument('--seed', type=int, help="Seed for generating the first board")
+    parser.add_argument('--record', metavar='PATH', help="Append the events of all played games to a log file")
+    parser.add_argument('--replay', metavar='PATH', nargs='+', help="Replay log files headlessly instead of playing")
+    parser.add_argument('--processes', type=int, default=1, help="Number of processes replaying log files")
+    parser.add_argument('--perf-log', metavar='PATH',
+                        help="Write the timings of every frame to a .csv file or else a JSON lines file")
+    args = parser.parse_args()
+
+    if args.replay:
+        startTime = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as workers:
+            allResults = workers.map(replayLog, args.replay)
+        seconds = time.perf_counter() - startTime
+        games = [result for results in allResults for result in results]
+        noOfEvents = sum(result['events'] for result in games)
+        print("Replayed", len(games), "games with", noOfEvents, "events in", round(seconds, 3), "seconds")
+        print("Won:", sum(result['status'] == 'won' for result in games),
+              "Lost:", sum(result['status'] == 'lost' for result in games),
+              "Events per second:", round(noOfEvents / seconds) if seconds > 0 else noOfEvents)
+    else:
+        recorder = GameRecorder(args.record) if args.record else None
+        perfMonitor = PerfMonitor(args.perf_log)
+        print("This is a Minesweeper game with Helper AI.\nWhen prompted please choose your desired difficulty.")
+        print("EASY:\t8x10 grid with 10 mines")
+        print("MEDIUM:\t14x18 grid with 40 mines")
+        print("HARD:\t20x24 grid with 99 mines")
+        takingInput = True
+        while takingInput:
+            difficulty = input(
+                "Enter 'E' for Easy, 'M' for Medium, 'H' for Hard and 'C' for custom: ")
+            if difficulty in ['E', 'e']:
                 takingInput = False
-                game(rows, cols, mines)
-            else:
-                print("Number of mines cannot be more than 25% of the board size.")
+                rows, cols, mines = EASY_ROWS, EASY_COLS, EASY_MINES
+            elif difficulty in ['M', 'm']:
+                takingInput = False
+                rows, cols, mines = MEDIUM_ROWS, MEDIUM_COLS, MEDIUM_MINES
+            elif difficulty in ['H', 'h']:
+                takingInput = False
+                rows, cols, mines = HARD_ROWS, HARD_COLS, HARD_MINES
+            elif difficulty in ['C', 'c']:
+                rows = int(input("Enter Number of rows: "))
+                cols = int(input("Enter number of columns: "))
+                mines = int(input(
+                    "Enter number of mines to place (Should be less than 25% of the board size): "))
+                if mines < (rows * cols) / 4:
+                    takingInput = False
+                else:
+                    print("Number of mines cannot be more than 25% of the board size.")
+        noGuess = input("Enter 'Y' to play a no-guess board (the start tile is opened for you): ")
+        if noGuess in ['Y', 'y']:
+            boardPool = BoardPool(rows, cols, mines)
+            boardPool.start()
+        else:
+            boardPool = None
+        try:
+            game(rows, cols, mines, boardPool, args.seed, recorder, perfMonitor)
+        finally:
+            if boardPool is not None:
+                boardPool.stop()
+            if recorder is not None:
+                recorder.close()
+            perfMonitor.close()
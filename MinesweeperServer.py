@@ -0,0 +1,315 @@
+"""
+Local multi-session Minesweeper server for bot clients.
+Clients connect over TCP on localhost and send one JSON object per line, every request gets one JSON line back.
+Requests:
+    {"op": "new", "rows": 20, "cols": 24, "bombs": 99, "seed": 1}   or   {"op": "new", "difficulty": "hard"}
+    {"op": "reveal", "session": 1, "row": 3, "col": 4}
+    {"op": "flag", "session": 1, "row": 3, "col": 4}
+    {"op": "helper", "session": 1, "helper": "CSP"}   (one of 'AMN', 'AFN', 'CSP', 'AI')
+    {"op": "state", "session": 1}
+    {"op": "close", "session": 1}
+An optional "id" is echoed back. Responses have "ok" and either "error" or "session", "status" and "board",
+where the board is a list of row strings with one character per tile:
+    '0'-'8' explored tile, '9' exploded mine, 'F' flagged, 'M' mine found by the AI, 'S' safe tile found by the AI,
+    '#' hidden tile
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from Minesweeper import *
+
+# Limits applied to every session
+MAX_SESSIONS = 1000
+MAX_CELLS = 10000  # Largest board rows * cols a session may use
+MAX_MOVES = 100000  # Reveal, flag and helper requests a session may make
+IDLE_TIMEOUT = 600  # Seconds after which an unused session is closed
+HELPER_SECONDS = 1.0  # Time budget of a single CSP helper request
+MAX_LINE_BYTES = 2 ** 16  # Longest request line, longer ones are answered with an error
+
+
+def isInteger(value):
+    """
+    Helper function to check a request field is an integer, JSON true and false are bools which are ints in Python
+    :param value: Value of the field
+    :return: True if value is an integer but not a bool else False
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class RequestError(Exception):
+    """Raised for requests that can't be served, its message is sent back to the client"""
+
+
+def solveSnapshot(snapshot, seconds):
+    """
+    Worker process function running cspSolver() on a snapshot of a session's game
+    :param snapshot: Snapshot of the game state made by snapshotSquares()
+    :param seconds: Time budget for solving
+    :return: Tuple of foundConsistentSolution, deductions made by getDeductions() and whether solving completed
+    """
+    listOfSquares = squaresFromSnapshot(snapshot)
+    budget = SolverBudget(seconds)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        foundConsistentSolution = cspSolver(listOfSquares, budget)
+    return foundConsistentSolution, getDeductions(snapshot, listOfSquares), not budget.exhausted
+
+
+async def readRequestLine(reader):
+    """
+    Helper function to read the next request line of a client, skipping lines longer than the reader's limit
+    :param reader: asyncio StreamReader of the connection
+    :return: Line, b'' at the end of the stream or None if the line was too long
+    """
+    tooLong = False
+    while True:
+        try:
+            line = await reader.readuntil(b'\n')
+            return None if tooLong else line
+        except asyncio.IncompleteReadError as error:
+            return None if tooLong else error.partial
+        except asyncio.LimitOverrunError as error:
+            # The start of the line is left in the buffer, so it's dropped before looking for its end again
+            tooLong = True
+            await reader.readexactly(error.consumed)
+
+
+def renderBoard(listOfSquares):
+    """
+    Helper function to describe the board the way the player sees it
+    :param listOfSquares: List of all Square Objects in the game
+    :return: List of strings, one character per tile as described in the module docstring
+    """
+    return [''.join([str(square.val) if square.visible else 'F' if square.flag else 'M' if square.flagAI else
+                     'S' if square.safe else '#' for square in row]) for row in listOfSquares]
+
+
+class Session:
+    """Class for a single game played by a bot"""
+
+    def __init__(self, sessionId, state):
+        """
+        :param sessionId: Number identifying the session
+        :param state: GameState of the session's game
+        """
+        self.sessionId = sessionId
+        self.state = state
+        self.lock = asyncio.Lock()  # Requests of a session are served one at a time
+        self.moves = 0
+        self.lastUsed = time.monotonic()
+
+    def describe(self, **extra):
+        """
+        Method to build the response describing the session
+        :param extra: Additional response fields
+        :return: Response dictionary
+        """
+        response = {'ok': True, 'session': self.sessionId, 'status': self.state.status,
+                    'board': renderBoard(self.state.listOfSquares)}
+        response.update(extra)
+        return response
+
+
+class GameServer:
+    """Class serving many concurrent sessions over JSON lines"""
+
+    def __init__(self, executor, maxSessions=MAX_SESSIONS, maxCells=MAX_CELLS, maxMoves=MAX_MOVES,
+                 idleTimeout=IDLE_TIMEOUT, helperSeconds=HELPER_SECONDS):
+        """
+        :param executor: ProcessPoolExecutor running the CSP helper requests
+        :param maxSessions: Maximum number of open sessions (default: MAX_SESSIONS)
+        :param maxCells: Maximum rows * cols of a session's board (default: MAX_CELLS)
+        :param maxMoves: Maximum number of moves of a session (default: MAX_MOVES)
+        :param idleTimeout: Seconds after which an unused session is closed (default: IDLE_TIMEOUT)
+        :param helperSeconds: Time budget of a single CSP helper request (default: HELPER_SECONDS)
+        """
+        self.executor = executor
+        self.maxSessions = maxSessions
+        self.maxCells = maxCells
+        self.maxMoves = maxMoves
+        self.idleTimeout = idleTimeout
+        self.helperSeconds = helperSeconds
+        self.sessions = {}
+        self.nextSessionId = 1
+        self.requests = 0
+
+    def getSession(self, request):
+        """
+        Method to find the session a request is for
+        :param request: Request dictionary
+        :return: Session object
+        """
+        sessionId = request.get('session')
+        session = self.sessions.get(sessionId) if isInteger(sessionId) else None
+        if session is None:
+            raise RequestError("Unknown session: " + str(request.get('session')))
+        session.lastUsed = time.monotonic()
+        return session
+
+    def getTile(self, session, request):
+        """
+        Method to read a valid tile index from a request
+        :param session: Session the request is for
+        :param request: Request dictionary with 'row' and 'col'
+        :return: Tuple (row, col)
+        """
+        row, col = request.get('row'), request.get('col')
+        if not isInteger(row) or not isInteger(col) or \
+                not (0 <= row < session.state.rows and 0 <= col < session.state.cols):
+            raise RequestError("Invalid tile: " + str(row) + ", " + str(col))
+        return row, col
+
+    def countMove(self, session):
+        """
+        Method to count a move of a session against its limit
+        :param session: Session making a move
+        """
+        if session.moves >= self.maxMoves:
+            raise RequestError("Session reached the limit of " + str(self.maxMoves) + " moves")
+        session.moves += 1
+
+    async def handle(self, request):
+        """
+        Method to serve a single request
+        :param request: Request dictionary
+        :return: Response dictionary
+        """
+        op = request.get('op')
+        if op == 'new':
+            if len(self.sessions) >= self.maxSessions:
+                raise RequestError("Server reached the limit of " + str(self.maxSessions) + " sessions")
+            if 'difficulty' in request:
+                if not isinstance(request['difficulty'], str) or request['difficulty'] not in DIFFICULTIES:
+                    raise RequestError("Unknown difficulty: " + str(request['difficulty']))
+                rows, cols, bombs = DIFFICULTIES[request['difficulty']]
+            else:
+                rows, cols, bombs = request.get('rows'), request.get('cols'), request.get('bombs')
+                if not all(isInteger(value) and value > 0 for value in (rows, cols, bombs)):
+                    raise RequestError("'rows', 'cols' and 'bombs' must be positive integers")
+            if rows * cols > self.maxCells:
+                raise RequestError("Board is bigger than the limit of " + str(self.maxCells) + " tiles")
+            if bombs >= (rows * cols) / 4:
+                raise RequestError("Number of mines cannot be more than 25% of the board size.")
+            if request.get('seed') is not None and not isInteger(request['seed']):
+                raise RequestError("'seed' must be an integer or null")
+            session = Session(self.nextSessionId, GameState(rows, cols, bombs, request.get('seed')))
+            self.sessions[session.sessionId] = session
+            self.nextSessionId += 1
+            return session.describe(seed=session.state.seed)
+
+        session = self.getSession(request)
+        async with session.lock:
+            if op == 'reveal':
+                row, col = self.getTile(session, request)
+                self.countMove(session)
+                return session.describe(changed=session.state.reveal(row, col))
+            elif op == 'flag':
+                row, col = self.getTile(session, request)
+                self.countMove(session)
+                return session.describe(changed=session.state.toggleFlag(row, col))
+            elif op == 'helper':
+                helper = request.get('helper')
+                if helper not in HELPERS:
+                    raise RequestError("Unknown helper: " + str(helper))
+                self.countMove(session)
+                if helper != 'CSP' or session.state.status != 'playing':
+                    return session.describe(found=session.state.askHelper(helper), completed=True)
+                # The CSP tiers can take a while, so they run in another process to keep serving other sessions
+                snapshot = snapshotSquares(session.state.listOfSquares)
+                found, deductions, completed = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, solveSnapshot, snapshot, self.helperSeconds)
+                applyDeductions(session.state.listOfSquares, deductions)
+                return session.describe(found=found, completed=completed)
+            elif op == 'state':
+                return session.describe()
+            elif op == 'close':
+                del self.sessions[session.sessionId]
+                return {'ok': True, 'session': session.sessionId}
+        raise RequestError("Unknown op: " + str(op))
+
+    async def serveClient(self, reader, writer):
+        """
+        Method to serve all requests of a connected client, one JSON line at a time
+        :param reader: asyncio StreamReader of the connection
+        :param writer: asyncio StreamWriter of the connection
+        """
+        try:
+            while True:
+                line = await readRequestLine(reader)
+                if not line and line is not None:
+                    break
+                request = None
+                try:
+                    if line is None:
+                        raise RequestError("Request is longer than " + str(MAX_LINE_BYTES) + " bytes")
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise RequestError("Request must be a JSON object")
+                    response = await self.handle(request)
+                except (RequestError, ValueError) as error:
+                    response = {'ok': False, 'error': str(error)}
+                except Exception as error:
+                    # A bug serving one request shouldn't end the client's connection
+                    response = {'ok': False, 'error': "Internal error: " + type(error).__name__ + ": " + str(error)}
+                if isinstance(request, dict) and 'id' in request:
+                    response['id'] = request['id']
+                self.requests += 1
+                writer.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def closeIdleSessions(self):
+        """Method that keeps closing sessions that weren't used for idleTimeout seconds"""
+        while True:
+            await asyncio.sleep(min(self.idleTimeout, 60))
+            now = time.monotonic()
+            for sessionId, session in list(self.sessions.items()):
+                if now - session.lastUsed > self.idleTimeout and not session.lock.locked():
+                    del self.sessions[sessionId]
+
+
+async def serve(host, port, server):
+    """
+    Function to run the server until it is interrupted
+    :param host: Host to listen on
+    :param port: Port to listen on
+    :param server: GameServer serving the requests
+    """
+    listener = await asyncio.start_server(server.serveClient, host, port, limit=MAX_LINE_BYTES)
+    print("Serving Minesweeper on", host + ":" + str(port), file=sys.stderr)
+    asyncio.get_running_loop().create_task(server.closeIdleSessions())
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local Minesweeper server for bot clients")
+    parser.add_argument('--host', default='127.0.0.1', help="Host to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Processes for CSP helper requests")
+    parser.add_argument('--max-sessions', type=int, default=MAX_SESSIONS)
+    parser.add_argument('--max-cells', type=int, default=MAX_CELLS)
+    parser.add_argument('--max-moves', type=int, default=MAX_MOVES)
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT)
+    parser.add_argument('--helper-seconds', type=float, default=HELPER_SECONDS)
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(args.workers) as executor, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        # The game engine prints the board on every first click, which would slow the server down
+        gameServer = GameServer(executor, args.max_sessions, args.max_cells, args.max_moves,
+                                args.idle_timeout, args.helper_seconds)
+        # Stopping on SIGTERM the same way as on Ctrl+C also shuts the helper processes down
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            asyncio.run(serve(args.host, args.port, gameServer))
+        except KeyboardInterrupt:
+            pass